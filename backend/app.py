@@ -1,12 +1,25 @@
+import time
+BOOT_STARTED = time.perf_counter()
+
 from flask import Flask
 from flask_cors import CORS
-from database import init_db
+from database import init_db, get_pool_stats
+from question_generator import question_prefetcher, question_bank, conversation_store
+from llm_client import ollama_client
+from review_store import review_store
 from auth import auth
-from interview_routes import interview
-from emotion_api import emotion
+from interview_routes import interview, require_auth
+from emotion_api import emotion, warm_up as warm_up_emotion, STATS_ENABLED
 import os
+import sys
 import secrets
 
+# Blueprints served by this process, e.g. APP_BLUEPRINTS=emotion for dedicated
+# emotion workers and APP_BLUEPRINTS=auth,interview for the rest
+APP_BLUEPRINTS = [name.strip() for name in os.getenv('APP_BLUEPRINTS', 'auth,interview,emotion').split(',') if name.strip()]
+# Load the emotion model at worker boot rather than on the first frame
+EMOTION_WARMUP = os.getenv('EMOTION_WARMUP', 'true').lower() == 'true'
+
 # Create Flask app
 app = Flask(__name__)
 
@@ -17,17 +30,20 @@ app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['SESSION_COOKIE_SECURE'] = False  # Set to True in production with HTTPS
 
 # Enable CORS for frontend
-CORS(app, supports_credentials=True, origins=[
+CORS_ORIGINS = [
     'http://localhost:8000',
     'http://127.0.0.1:8000',
     'http://localhost:5500',  # VS Code Live Server
     'http://127.0.0.1:5500'
-])
+]
+CORS(app, supports_credentials=True, origins=CORS_ORIGINS)
 
 # Register blueprints
-app.register_blueprint(auth)
-app.register_blueprint(interview)
-app.register_blueprint(emotion)
+blueprints = {'auth': auth, 'interview': interview, 'emotion': emotion}
+for name in APP_BLUEPRINTS:
+    if name not in blueprints:
+        raise ValueError(f"Unknown blueprint in APP_BLUEPRINTS: {name}")
+    app.register_blueprint(blueprints[name])
 
 # Root route
 @app.route('/')
@@ -38,10 +54,58 @@ def index():
         'status': 'running'
     }
 
+# Runtime statistics for tuning
+@app.route('/stats')
+@require_auth
+def stats():
+    if not STATS_ENABLED:
+        return {'error': 'Not found'}, 404
+    return {
+        'database_pool': get_pool_stats(),
+        'question_prefetch': question_prefetcher.stats(),
+        'question_bank': question_bank.stats(),
+        'conversation_context': conversation_store.stats(),
+        'llm_client': ollama_client.stats(),
+        'review_cache': review_store.stats(),
+        'startup': startup_stats
+    }
+
+def peak_memory_mb():
+    """Peak resident memory of this process in MB, or None where unsupported"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in KB on Linux and in bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def warm_up_worker():
+    """Worker boot hook: load the emotion model once, before the first request"""
+    if 'emotion' not in APP_BLUEPRINTS or not EMOTION_WARMUP:
+        return
+    try:
+        startup_stats['warmup_seconds'] = round(warm_up_emotion(), 2)
+        startup_stats['peak_rss_mb_after_warmup'] = peak_memory_mb()
+        print(f"Emotion model warmed up in {startup_stats['warmup_seconds']}s "
+              f"(peak RSS {startup_stats['peak_rss_mb_after_warmup']} MB)")
+    except Exception as e:
+        # The model is then loaded by the first frame instead
+        print(f"Emotion warm-up error: {str(e)}")
+
 # Initialize database on startup
 with app.app_context():
     init_db()
 
+startup_stats = {
+    'blueprints': APP_BLUEPRINTS,
+    'boot_seconds': round(time.perf_counter() - BOOT_STARTED, 2),
+    'peak_rss_mb': peak_memory_mb(),
+    'vision_stack_loaded': 'cv2' in sys.modules
+}
+print(f"App loaded in {startup_stats['boot_seconds']}s (peak RSS {startup_stats['peak_rss_mb']} MB, "
+      f"blueprints: {', '.join(APP_BLUEPRINTS)})")
+
 if __name__ == '__main__':
     print("\n" + "="*60)
     print("AI Interview Platform Backend Server")
@@ -53,4 +117,8 @@ if __name__ == '__main__':
     print("To pull model: ollama pull llama2")
     print("="*60 + "\n")
 
+    # Only in the reloader's serving process, not the one watching files
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        warm_up_worker()
+
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,74 @@
+# ASGI entry point: hypercorn asgi:app --bind 0.0.0.0:5000
+#
+# The LLM-bound interview routes (see async_interview_routes.ASYNC_PATHS) are
+# served natively, so a slow Ollama call doesn't hold a thread. Every other
+# route of the Flask app, including auth, runs unchanged on the default
+# executor's threads (ASGI_EXECUTOR_WORKERS), concurrently.
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from concurrent.futures import ThreadPoolExecutor
+from quart import Quart, request
+from app import app as flask_app, CORS_ORIGINS, warm_up_worker
+from async_interview_routes import interview_async, ASYNC_PATHS
+import asyncio
+import os
+
+# Threads for database work and for the Flask routes
+ASGI_EXECUTOR_WORKERS = int(os.getenv('ASGI_EXECUTOR_WORKERS', 32))
+
+async_app = Quart(__name__)
+
+# Sessions are shared with the Flask app, so the key and cookie settings must match
+for key in ('SECRET_KEY', 'SESSION_COOKIE_HTTPONLY', 'SESSION_COOKIE_SAMESITE', 'SESSION_COOKIE_SECURE'):
+    async_app.config[key] = flask_app.config[key]
+
+async_app.register_blueprint(interview_async)
+
+@async_app.before_serving
+async def configure_executor():
+    """Size the default executor used by asyncio.to_thread and the Flask routes"""
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=ASGI_EXECUTOR_WORKERS, thread_name_prefix='asgi-executor')
+    )
+
+@async_app.before_serving
+async def warm_up():
+    """Load the emotion model once per worker before serving"""
+    await asyncio.to_thread(warm_up_worker)
+
+@async_app.after_request
+async def add_cors_headers(response):
+    """Same CORS policy flask-cors applies to the Flask app"""
+    origin = request.headers.get('Origin')
+    if origin in CORS_ORIGINS:
+        response.headers['Access-Control-Allow-Origin'] = origin
+        response.headers['Access-Control-Allow-Credentials'] = 'true'
+        response.headers['Vary'] = 'Origin'
+    return response
+
+class ThreadedWsgiToAsgiInstance(WsgiToAsgiInstance):
+    # asgiref runs WSGI apps thread-sensitively, i.e. one request at a time on a
+    # single shared thread; Flask routes are thread-safe, so use the executor
+    run_wsgi_app = sync_to_async(WsgiToAsgiInstance.__dict__['run_wsgi_app'].func, thread_sensitive=False)
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi that runs requests concurrently on the loop's default executor"""
+
+    async def __call__(self, scope, receive, send):
+        await ThreadedWsgiToAsgiInstance(self.wsgi_application)(scope, receive, send)
+
+flask_asgi = ThreadedWsgiToAsgi(flask_app)
+
+async def app(scope, receive, send):
+    """Dispatch to the async routes or to the Flask app"""
+    if scope['type'] == 'lifespan':
+        await async_app(scope, receive, send)
+    elif scope['type'] == 'websocket':
+        # The emotion WebSocket needs the WSGI server; clients fall back to HTTP uploads
+        await receive()
+        await send({'type': 'websocket.close', 'code': 1008})
+    elif scope['path'] in ASYNC_PATHS and scope['method'] != 'OPTIONS':
+        await async_app(scope, receive, send)
+    else:
+        # Includes CORS preflights, which flask-cors answers
+        await flask_asgi(scope, receive, send)
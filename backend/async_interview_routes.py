@@ -0,0 +1,230 @@
+from quart import Blueprint, request, jsonify, session, Response
+from functools import wraps
+from interview_routes import (
+    create_interview, store_question_plan, save_question,
+    take_planned_question, get_previous_answer, sse_event
+)
+from question_generator import (
+    agenerate_question_text, astream_question_text, agenerate_question_plan,
+    question_prefetcher, QUESTION_PREFETCH, QUESTION_MODE, QUESTION_CONTEXT, MAX_QUESTIONS
+)
+import requests
+import asyncio
+
+# Async versions of the LLM-bound interview routes, served by asgi.py. Same
+# paths and responses as interview_routes; database work runs in the executor.
+interview_async = Blueprint('interview_async', __name__, url_prefix='/api/interview')
+
+# Paths asgi.py routes to this blueprint instead of the Flask app
+ASYNC_PATHS = {
+    '/api/interview/start',
+    '/api/interview/generate-question',
+    '/api/interview/generate-question/stream'
+}
+
+def require_auth(f):
+    """Decorator to check if user is logged in"""
+    @wraps(f)
+    async def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({'error': 'Authentication required'}), 401
+        return await f(*args, **kwargs)
+    return decorated_function
+
+def sse_response(events):
+    """Wrap an async iterator of SSE strings in a streaming response"""
+    return Response(
+        events,
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@interview_async.route('/start', methods=['POST'])
+@require_auth
+async def start_interview():
+    """Start new interview session"""
+    try:
+        data = await request.get_json()
+
+        if not data:
+            return jsonify({'error': 'Invalid request data'}), 400
+
+        job_role = data.get('job_role', '').strip()
+
+        if not job_role:
+            return jsonify({'error': 'Job role is required'}), 400
+
+        question_mode = data.get('question_mode', QUESTION_MODE)
+        if question_mode not in ('incremental', 'plan'):
+            return jsonify({'error': 'Invalid question mode'}), 400
+
+        user_id = session.get('user_id')
+
+        # Create new interview record
+        interview_id = await asyncio.to_thread(create_interview, user_id, job_role)
+
+        # Plan mode: generate every question now and store them, not yet asked
+        planned_questions = 0
+        if question_mode == 'plan':
+            plan = await agenerate_question_plan(interview_id, job_role, MAX_QUESTIONS)
+            planned_questions = await asyncio.to_thread(store_question_plan, interview_id, plan)
+
+        return jsonify({
+            'success': True,
+            'interview_id': interview_id,
+            'question_mode': question_mode,
+            'planned_questions': planned_questions,
+            'message': 'Interview started'
+        }), 201
+
+    except Exception as e:
+        print(f"Start interview error: {str(e)}")
+        return jsonify({'error': 'Failed to start interview'}), 500
+
+async def read_question_request():
+    """Return (interview_id, job_role, question_number) or an error response"""
+    data = await request.get_json()
+
+    if not data:
+        return None, (jsonify({'error': 'Invalid request data'}), 400)
+
+    interview_id = data.get('interview_id')
+    job_role = data.get('job_role', '').strip()
+    question_number = data.get('question_number')
+
+    if not interview_id or not job_role or not question_number:
+        return None, (jsonify({'error': 'Missing required fields'}), 400)
+
+    return (interview_id, job_role, question_number), None
+
+async def take_prefetched(interview_id, job_role, question_number):
+    """Prefetched question, waited for in the executor, or None"""
+    if not QUESTION_PREFETCH:
+        return None
+    return await asyncio.to_thread(question_prefetcher.take, interview_id, job_role, question_number)
+
+@interview_async.route('/generate-question', methods=['POST'])
+@require_auth
+async def generate_question():
+    """Generate next interview question using Ollama"""
+    try:
+        fields, error = await read_question_request()
+        if error:
+            return error
+        interview_id, job_role, question_number = fields
+
+        # Interviews started in plan mode already have their questions stored
+        planned = await asyncio.to_thread(take_planned_question, interview_id, question_number)
+        if planned is not None:
+            question_id, question_text = planned
+            return jsonify({
+                'success': True,
+                'question': question_text,
+                'question_id': question_id
+            }), 200
+
+        try:
+            question_text = await take_prefetched(interview_id, job_role, question_number)
+            if question_text is None:
+                previous_answer = None
+                if QUESTION_CONTEXT:
+                    previous_answer = await asyncio.to_thread(get_previous_answer, interview_id, question_number)
+                question_text = await agenerate_question_text(interview_id, job_role, question_number, previous_answer)
+
+        except requests.exceptions.ConnectionError:
+            return jsonify({'error': 'AI service unavailable. Please ensure Ollama is running.'}), 503
+        except requests.exceptions.Timeout:
+            return jsonify({'error': 'AI service timeout. Please try again.'}), 503
+
+        question_id = await asyncio.to_thread(save_question, interview_id, question_text, question_number)
+
+        if QUESTION_PREFETCH and not QUESTION_CONTEXT:
+            question_prefetcher.prefetch(interview_id, job_role, question_number + 1)
+
+        return jsonify({
+            'success': True,
+            'question': question_text,
+            'question_id': question_id
+        }), 200
+
+    except Exception as e:
+        print(f"Generate question error: {str(e)}")
+        return jsonify({'error': 'Failed to generate question'}), 500
+
+@interview_async.route('/generate-question/stream', methods=['POST'])
+@require_auth
+async def generate_question_stream():
+    """Generate next interview question, streaming its tokens as Server-Sent Events"""
+    try:
+        fields, error = await read_question_request()
+        if error:
+            return error
+        interview_id, job_role, question_number = fields
+
+        # Interviews started in plan mode already have their questions stored
+        planned = await asyncio.to_thread(take_planned_question, interview_id, question_number)
+        if planned is not None:
+            question_id, question_text = planned
+
+            async def planned_events():
+                yield sse_event('token', {'text': question_text})
+                yield sse_event('done', {
+                    'success': True,
+                    'question': question_text,
+                    'question_id': question_id
+                })
+
+            return sse_response(planned_events())
+
+        try:
+            question_text = await take_prefetched(interview_id, job_role, question_number)
+            if question_text is not None:
+                tokens = None
+            else:
+                previous_answer = None
+                if QUESTION_CONTEXT:
+                    previous_answer = await asyncio.to_thread(get_previous_answer, interview_id, question_number)
+                tokens = await astream_question_text(interview_id, job_role, question_number, previous_answer)
+
+        except requests.exceptions.ConnectionError:
+            return jsonify({'error': 'AI service unavailable. Please ensure Ollama is running.'}), 503
+        except requests.exceptions.Timeout:
+            return jsonify({'error': 'AI service timeout. Please try again.'}), 503
+
+        async def events():
+            parts = []
+            if tokens is None:
+                parts.append(question_text)
+                yield sse_event('token', {'text': question_text})
+            else:
+                async for token in tokens:
+                    parts.append(token)
+                    yield sse_event('token', {'text': token})
+
+            full_text = ''.join(parts).strip()
+            if not full_text:
+                full_text = f"Tell me about your experience relevant to {job_role}."
+                yield sse_event('token', {'text': full_text})
+
+            # The full text is stored once the stream has finished
+            try:
+                question_id = await asyncio.to_thread(save_question, interview_id, full_text, question_number)
+            except Exception as e:
+                print(f"Generate question stream error: {str(e)}")
+                yield sse_event('error', {'error': 'Failed to generate question'})
+                return
+
+            if QUESTION_PREFETCH and not QUESTION_CONTEXT:
+                question_prefetcher.prefetch(interview_id, job_role, question_number + 1)
+
+            yield sse_event('done', {
+                'success': True,
+                'question': full_text,
+                'question_id': question_id
+            })
+
+        return sse_response(events())
+
+    except Exception as e:
+        print(f"Generate question error: {str(e)}")
+        return jsonify({'error': 'Failed to generate question'}), 500
@@ -0,0 +1,149 @@
+from emotion_backends import create_backend
+from emotion_model import EMOTION_LABELS, FACE_SIZE
+import argparse
+import time
+import os
+
+# Side-by-side comparison of emotion backends on the same images:
+#   python benchmark_emotion.py path/to/frames --backends deepface,onnx,opencv
+# Reports detection and classification latency per backend, batch throughput,
+# and how often each backend's labels agree with the first one's.
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+def load_images(path, limit):
+    """Read up to limit images from a directory (or a single file) as BGR arrays"""
+    import cv2
+
+    if os.path.isdir(path):
+        names = sorted(n for n in os.listdir(path) if n.lower().endswith(IMAGE_EXTENSIONS))
+        files = [os.path.join(path, n) for n in names[:limit]]
+    else:
+        files = [path]
+
+    images = []
+    for file in files:
+        img = cv2.imread(file)
+        if img is not None:
+            images.append(img)
+    return images
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+def latency_summary(seconds):
+    ms = [1000 * s for s in seconds]
+    return {
+        'p50_ms': round(percentile(ms, 50), 2),
+        'p95_ms': round(percentile(ms, 95), 2),
+        'mean_ms': round(sum(ms) / len(ms), 2)
+    }
+
+def labels_of(predictions):
+    import numpy as np
+    return [EMOTION_LABELS[int(np.argmax(scores))] for scores in predictions]
+
+def run_backend(backend, images, shared_faces, batch_size, repeat):
+    """Time one backend; returns its stats plus end-to-end and shared-crop labels"""
+    import cv2
+    import numpy as np
+
+    started = time.perf_counter()
+    backend.load()
+    load_seconds = time.perf_counter() - started
+
+    # Untimed warm-up so graph setup isn't counted
+    backend.predict(np.zeros((1, FACE_SIZE, FACE_SIZE, 1), dtype=np.float32))
+
+    detect_times, classify_times, labels = [], [], []
+    faces_found = 0
+    for _ in range(repeat):
+        labels = []
+        for img in images:
+            started = time.perf_counter()
+            face_gray, region = backend.detect(img)
+            face = cv2.resize(face_gray, (FACE_SIZE, FACE_SIZE)).astype(np.float32)
+            detect_times.append(time.perf_counter() - started)
+            faces_found += region is not None
+
+            started = time.perf_counter()
+            predictions = backend.predict(face[np.newaxis, ..., np.newaxis])
+            classify_times.append(time.perf_counter() - started)
+            labels.extend(labels_of(predictions))
+
+    # Classifier alone on identical crops, in batches like the scheduler sends
+    batch = np.stack(shared_faces)[..., np.newaxis]
+    shared_labels = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        shared_labels = []
+        for i in range(0, len(batch), batch_size):
+            shared_labels.extend(labels_of(backend.predict(batch[i:i + batch_size])))
+    batch_seconds = time.perf_counter() - started
+
+    stats = {
+        'load_s': round(load_seconds, 2),
+        'detect': latency_summary(detect_times),
+        'classify': latency_summary(classify_times),
+        'faces_found': round(faces_found / (repeat * len(images)), 3),
+        'batch_faces_per_s': round(repeat * len(batch) / batch_seconds, 1)
+    }
+    return stats, labels, shared_labels
+
+def agreement(labels, reference):
+    matches = sum(1 for a, b in zip(labels, reference) if a == b)
+    return round(matches / len(reference), 3) if reference else 0
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare emotion backends on latency and label agreement')
+    parser.add_argument('images', help='directory of frames (or one image file)')
+    parser.add_argument('--backends', default='deepface,onnx', help='comma-separated backends, the first is the reference')
+    parser.add_argument('--limit', type=int, default=200, help='maximum number of images')
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    import cv2
+    import numpy as np
+
+    images = load_images(args.images, args.limit)
+    if not images:
+        print(f"No images found at {args.images}")
+        return
+
+    names = [name.strip() for name in args.backends.split(',') if name.strip()]
+
+    # The same crops for every classifier, cut with the detector that needs no model
+    from emotion_backends import detect_with_cascade
+    shared_faces = [
+        cv2.resize(detect_with_cascade(img)[0], (FACE_SIZE, FACE_SIZE)).astype(np.float32)
+        for img in images
+    ]
+
+    print(f"{len(images)} images, batch size {args.batch_size}, {args.repeat} repeats")
+    reference = None
+    for name in names:
+        try:
+            stats, labels, shared_labels = run_backend(
+                create_backend(name), images, shared_faces, args.batch_size, args.repeat
+            )
+        except Exception as e:
+            print(f"\n{name}: failed - {str(e)}")
+            continue
+
+        print(f"\n{name}")
+        print(f"  load           {stats['load_s']} s")
+        print(f"  detect         p50 {stats['detect']['p50_ms']} ms, p95 {stats['detect']['p95_ms']} ms, faces found {stats['faces_found']}")
+        print(f"  classify (1)   p50 {stats['classify']['p50_ms']} ms, p95 {stats['classify']['p95_ms']} ms")
+        print(f"  classify batch {stats['batch_faces_per_s']} faces/s")
+
+        if reference is None:
+            reference = (name, labels, shared_labels)
+        else:
+            ref_name, ref_labels, ref_shared = reference
+            print(f"  agreement with {ref_name}: {agreement(labels, ref_labels)} end to end, "
+                  f"{agreement(shared_labels, ref_shared)} on identical crops")
+
+if __name__ == '__main__':
+    main()
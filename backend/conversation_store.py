@@ -0,0 +1,102 @@
+from database import get_db_connection
+from ttl_cache import TTLCache
+from array import array
+import threading
+
+class ConversationStore:
+    """Ollama context tokens per interview, cached in memory and persisted in the database.
+
+    A context is tagged with the question it produced, so a question is only
+    generated on top of the conversation that directly precedes it.
+    """
+
+    def __init__(self, max_tokens=4096, max_interviews=256, ttl_seconds=3600):
+        self.max_tokens = max_tokens
+        self._cache = TTLCache(max_entries=max_interviews, ttl_seconds=ttl_seconds)
+        self._lock = threading.Lock()
+
+        self.saved = 0
+        self.resets = 0
+
+    def get(self, interview_id, question_number):
+        """Return the context left by question_number, or None"""
+        entry = self._cache.get(str(interview_id))
+        if entry is None:
+            entry = self._load(interview_id)
+            if entry is not None:
+                self._cache.set(str(interview_id), entry)
+
+        if entry is None or entry[0] != question_number:
+            return None
+        return list(entry[1])
+
+    def save(self, interview_id, question_number, context):
+        """Keep the context returned after generating question_number"""
+        if not context:
+            return
+
+        # Over the cap the conversation restarts from a fresh prompt
+        if len(context) > self.max_tokens:
+            self.forget(interview_id)
+            with self._lock:
+                self.resets += 1
+            return
+
+        tokens = array('i', context)
+        self._cache.set(str(interview_id), (question_number, tokens))
+
+        # Persisted so a restart doesn't lose the conversation; the cache still serves it if this fails
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO interview_context (interview_id, question_number, context, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (interview_id) DO UPDATE SET
+                    question_number = excluded.question_number,
+                    context = excluded.context,
+                    updated_at = excluded.updated_at
+            ''', (int(interview_id), question_number, tokens.tobytes()))
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"Conversation context save error: {str(e)}")
+
+        with self._lock:
+            self.saved += 1
+
+    def forget(self, interview_id):
+        """Drop the context of an interview that has ended"""
+        self._cache.pop(str(interview_id))
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM interview_context WHERE interview_id = ?', (int(interview_id),))
+        conn.commit()
+        conn.close()
+
+    def _load(self, interview_id):
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT question_number, context FROM interview_context WHERE interview_id = ?',
+            (int(interview_id),)
+        )
+        row = cursor.fetchone()
+        conn.close()
+
+        if not row:
+            return None
+        tokens = array('i')
+        tokens.frombytes(row['context'])
+        return row['question_number'], tokens
+
+    def stats(self):
+        """Return cache and reset counters"""
+        with self._lock:
+            return {
+                'max_tokens': self.max_tokens,
+                'saved': self.saved,
+                'resets': self.resets,
+                'cache': self._cache.stats()
+            }
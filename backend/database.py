@@ -1,14 +1,432 @@
 import sqlite3
+import threading
+import sys
+import time
 import os
 from datetime import datetime
+from timeline_store import pack_completed_timelines
 
 DATABASE_PATH = os.path.join(os.path.dirname(__file__), 'instance', 'interview.db')
 
+# Connection pool and SQLite tuning
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 8))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))
+DB_BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', 5000))
+DB_JOURNAL_MODE = os.getenv('DB_JOURNAL_MODE', 'WAL')
+DB_SYNCHRONOUS = os.getenv('DB_SYNCHRONOUS', 'NORMAL')
+DB_CACHE_SIZE_KB = int(os.getenv('DB_CACHE_SIZE_KB', 16384))
+DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', 256 * 1024 * 1024))
+
+class PooledConnection:
+    """Wraps a pooled sqlite3 connection so close() returns it to the pool"""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError('Cannot operate on a closed database.')
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._conn.__exit__(exc_type, exc_value, traceback)
+
+    def close(self):
+        """Return the connection to the pool"""
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.release(conn)
+
+    def __del__(self):
+        # Error paths that never call close() must not leak pool slots
+        self.close()
+
+class ConnectionPool:
+    """Fixed-size pool of tuned SQLite connections shared between threads"""
+
+    def __init__(self, path, size=8, timeout=10):
+        self.path = path
+        self.size = max(1, size)
+        self.timeout = timeout
+
+        self._idle = []
+        self._open = 0
+        self._cond = threading.Condition()
+
+        self._acquired = 0
+        self._created = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._in_use = 0
+        self._peak_in_use = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        conn.row_factory = sqlite3.Row  # Enable column access by name
+        # Only takes effect on a new database, and must precede the switch to WAL
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute(f'PRAGMA journal_mode = {DB_JOURNAL_MODE}')
+        conn.execute(f'PRAGMA synchronous = {DB_SYNCHRONOUS}')
+        conn.execute(f'PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}')
+        conn.execute(f'PRAGMA cache_size = -{DB_CACHE_SIZE_KB}')
+        conn.execute(f'PRAGMA mmap_size = {DB_MMAP_SIZE}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        return conn
+
+    def acquire(self):
+        """Take an idle connection, opening one if below the pool size"""
+        deadline = time.monotonic() + self.timeout
+
+        with self._cond:
+            while not self._idle and self._open >= self.size:
+                self._waits += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    if not self._idle and self._open >= self.size:
+                        self._timeouts += 1
+                        raise sqlite3.OperationalError('Database connection pool exhausted')
+
+            conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                self._open += 1
+            self._mark_acquired()
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._created += 1
+
+        return PooledConnection(self, conn)
+
+    def _mark_acquired(self):
+        self._acquired += 1
+        self._in_use += 1
+        self._peak_in_use = max(self._peak_in_use, self._in_use)
+
+    def release(self, conn):
+        """Roll back anything left uncommitted and make the connection idle again"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            conn = None
+
+        with self._cond:
+            self._in_use -= 1
+            if conn is None:
+                self._open -= 1
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    def stats(self):
+        """Return pool usage statistics"""
+        with self._cond:
+            return {
+                'size': self.size,
+                'open': self._open,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'peak_in_use': self._peak_in_use,
+                'acquired': self._acquired,
+                'created': self._created,
+                'reused': self._acquired - self._created,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'pragmas': {
+                    'journal_mode': DB_JOURNAL_MODE,
+                    'synchronous': DB_SYNCHRONOUS,
+                    'busy_timeout_ms': DB_BUSY_TIMEOUT_MS,
+                    'cache_size_kb': DB_CACHE_SIZE_KB,
+                    'mmap_size': DB_MMAP_SIZE
+                }
+            }
+
+_pool = ConnectionPool(DATABASE_PATH, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT)
+
 def get_db_connection():
-    """Create and return a database connection"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row  # Enable column access by name
-    return conn
+    """Return a pooled database connection; close() hands it back to the pool"""
+    return _pool.acquire()
+
+def get_pool_stats():
+    """Return connection pool usage statistics"""
+    return _pool.stats()
+
+# Versioned schema migrations applied by init_db, tracked with PRAGMA user_version.
+# Each step is a SQL statement or a function taking the cursor. Never edit a
+# migration that has shipped - append a new one instead.
+MIGRATIONS = [
+    (1, 'Indexes for hot lookup paths', [
+        # /end and /details read one interview's timeline in time order
+        'CREATE INDEX IF NOT EXISTS idx_emotion_timeline_interview '
+        'ON emotion_timeline (interview_id, timestamp, emotion_label, confidence)',
+        'CREATE INDEX IF NOT EXISTS idx_posture_events_interview '
+        'ON posture_events (interview_id, posture_label)',
+        # /details joins questions to answers
+        'CREATE INDEX IF NOT EXISTS idx_interview_questions_interview '
+        'ON interview_questions (interview_id, question_number)',
+        'CREATE INDEX IF NOT EXISTS idx_interview_answers_question '
+        'ON interview_answers (question_id)',
+        # /history filters by user and status, newest first
+        'CREATE INDEX IF NOT EXISTS idx_interviews_user_status '
+        'ON interviews (user_id, status, started_at)',
+    ]),
+    (2, 'Running per-interview emotion/posture counters', [
+        '''
+        CREATE TABLE IF NOT EXISTS interview_stats (
+            interview_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            label TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            confidence_sum FLOAT NOT NULL DEFAULT 0,
+            PRIMARY KEY (interview_id, kind, label)
+        ) WITHOUT ROWID
+        ''',
+        # Backfill from telemetry recorded before the counters existed
+        '''
+        INSERT OR REPLACE INTO interview_stats (interview_id, kind, label, count, confidence_sum)
+        SELECT interview_id, 'emotion', emotion_label, COUNT(*), SUM(confidence)
+        FROM emotion_timeline GROUP BY interview_id, emotion_label
+        ''',
+        '''
+        INSERT OR REPLACE INTO interview_stats (interview_id, kind, label, count, confidence_sum)
+        SELECT interview_id, 'posture', posture_label, COUNT(*), 0
+        FROM posture_events GROUP BY interview_id, posture_label
+        ''',
+    ]),
+    (3, 'Ollama conversation context per interview', [
+        '''
+        CREATE TABLE IF NOT EXISTS interview_context (
+            interview_id INTEGER PRIMARY KEY,
+            question_number INTEGER NOT NULL,
+            context BLOB NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (interview_id) REFERENCES interviews (id)
+        )
+        ''',
+    ]),
+    (4, 'Covering index for /history validators', [
+        # COUNT/MAX over a user's completed interviews without touching the table
+        'CREATE INDEX IF NOT EXISTS idx_interviews_user_ended '
+        'ON interviews (user_id, status, ended_at)',
+    ]),
+    (5, 'Stored review payloads of completed interviews', [
+        '''
+        CREATE TABLE IF NOT EXISTS interview_reviews (
+            interview_id INTEGER PRIMARY KEY,
+            payload BLOB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (interview_id) REFERENCES interviews (id)
+        )
+        ''',
+    ]),
+    (6, 'Packed emotion timelines of completed interviews', [
+        '''
+        CREATE TABLE IF NOT EXISTS emotion_timeline_packed (
+            interview_id INTEGER PRIMARY KEY,
+            samples INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            FOREIGN KEY (interview_id) REFERENCES interviews (id)
+        )
+        ''',
+        # Convert the rows of interviews completed before packing existed
+        pack_completed_timelines,
+    ]),
+    (7, 'Per-minute telemetry summaries left by retention', [
+        '''
+        CREATE TABLE IF NOT EXISTS telemetry_minutes (
+            interview_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            minute TIMESTAMP NOT NULL,
+            label TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            confidence_sum FLOAT NOT NULL DEFAULT 0,
+            PRIMARY KEY (interview_id, kind, minute, label)
+        ) WITHOUT ROWID
+        ''',
+    ]),
+    (8, 'Posture intervals with durations', [
+        # Seconds a posture was held; NULL for single events from /save-posture
+        'ALTER TABLE posture_events ADD COLUMN duration FLOAT',
+        'ALTER TABLE interview_stats ADD COLUMN duration_sum FLOAT NOT NULL DEFAULT 0',
+    ]),
+    (9, 'Posture durations in per-minute summaries', [
+        'ALTER TABLE telemetry_minutes ADD COLUMN duration_sum FLOAT NOT NULL DEFAULT 0',
+    ]),
+    (10, 'Rebuild stored reviews at the history page timeline budget', [
+        # Rebuilt on their next /details view
+        'DELETE FROM interview_reviews',
+    ]),
+]
+
+# Hot queries whose plans must use an index (see check_query_plans)
+HOT_QUERIES = {
+    'end: dominant label': (
+        'SELECT label FROM interview_stats WHERE interview_id = ? AND kind = ? '
+        'ORDER BY duration_sum DESC, count DESC LIMIT 1', (1, 'posture')
+    ),
+    'details: label counts': (
+        'SELECT label, count, confidence_sum, duration_sum FROM interview_stats '
+        'WHERE interview_id = ? AND kind = ?', (1, 'posture')
+    ),
+    'details: qa pairs': (
+        'SELECT q.question_text, q.asked_at, a.answer_text FROM interview_questions q '
+        'LEFT JOIN interview_answers a ON q.id = a.question_id '
+        'WHERE q.interview_id = ? AND q.asked_at IS NOT NULL ORDER BY q.question_number', (1,)
+    ),
+    'details: emotion timeline': (
+        'SELECT emotion_label, confidence, timestamp FROM emotion_timeline '
+        'WHERE interview_id = ? ORDER BY timestamp', (1,)
+    ),
+    'details: packed timeline': (
+        'SELECT data FROM emotion_timeline_packed WHERE interview_id = ?', (1,)
+    ),
+    'details: minute timeline': (
+        'SELECT minute, label, count, confidence_sum FROM telemetry_minutes '
+        'WHERE interview_id = ? AND kind = ?', (1, 'emotion')
+    ),
+    'details: timeline span': (
+        'SELECT MIN(timestamp), MAX(timestamp), COUNT(*) FROM emotion_timeline '
+        'WHERE interview_id = ?', (1,)
+    ),
+    'history': (
+        'SELECT id, job_role, started_at, ended_at, overall_emotion, overall_posture '
+        'FROM interviews WHERE user_id = ? AND status = \'completed\' AND (started_at, id) < (?, ?) '
+        'ORDER BY started_at DESC, id DESC LIMIT ?', (1, '9999', 0, 20)
+    ),
+    'history: validators': (
+        'SELECT COUNT(*), MAX(id), MAX(ended_at) FROM interviews '
+        'WHERE user_id = ? AND status = \'completed\'', (1,)
+    ),
+}
+
+def run_migrations(conn):
+    """Apply every migration newer than the database's user_version"""
+    cursor = conn.cursor()
+    current_version = cursor.execute('PRAGMA user_version').fetchone()[0]
+
+    for version, description, steps in MIGRATIONS:
+        if version <= current_version:
+            continue
+
+        cursor.execute('BEGIN')
+        try:
+            for step in steps:
+                if callable(step):
+                    step(cursor)
+                else:
+                    cursor.execute(step)
+            cursor.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        print(f"Applied migration {version}: {description}")
+
+def check_query_plans(conn):
+    """Return (name, plan, uses_index) for each hot query; full table scans fail"""
+    results = []
+    for name, (sql, params) in HOT_QUERIES.items():
+        rows = conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+        plan = [row['detail'] for row in rows]
+        full_scans = [
+            detail for detail in plan
+            if detail.startswith('SCAN') and 'USING' not in detail
+        ]
+        results.append((name, plan, not full_scans))
+    return results
+
+def get_label_counts(cursor, interview_id, kind):
+    """Return {label: (count, confidence_sum, duration_sum)} from the running counters"""
+    cursor.execute(
+        'SELECT label, count, confidence_sum, duration_sum FROM interview_stats WHERE interview_id = ? AND kind = ?',
+        (interview_id, kind)
+    )
+    return {
+        row['label']: (row['count'], row['confidence_sum'], row['duration_sum'])
+        for row in cursor.fetchall()
+    }
+
+def get_dominant_label(cursor, interview_id, kind):
+    """Return the dominant label of an interview from the running counters.
+
+    Posture labels are ranked by seconds held, then by count (single events have
+    no duration); emotion samples carry no duration, so they rank by count.
+    """
+    cursor.execute(
+        'SELECT label FROM interview_stats WHERE interview_id = ? AND kind = ? '
+        'ORDER BY duration_sum DESC, count DESC LIMIT 1',
+        (interview_id, kind)
+    )
+    row = cursor.fetchone()
+    return row['label'] if row else None
+
+def get_timeline_span(cursor, interview_id):
+    """Return (first_timestamp, seconds_covered, rows) of an interview's emotion timeline"""
+    cursor.execute('''
+        SELECT MIN(timestamp) AS first_seen,
+               strftime('%s', MAX(timestamp)) - strftime('%s', MIN(timestamp)) AS span,
+               COUNT(*) AS samples
+        FROM emotion_timeline
+        WHERE interview_id = ?
+    ''', (interview_id,))
+    row = cursor.fetchone()
+    return row['first_seen'], row['span'] or 0, row['samples']
+
+def get_bucketed_timeline(cursor, interview_id, first_seen, resolution):
+    """Aggregate an emotion timeline into resolution-second buckets.
+
+    Each bucket reports its dominant label, that label's mean confidence, the
+    bucket's first timestamp and the number of samples it covers.
+    """
+    cursor.execute('''
+        SELECT emotion_label, confidence, timestamp, samples
+        FROM (
+            SELECT bucket, emotion_label, AVG(confidence) AS confidence,
+                   ROW_NUMBER() OVER (PARTITION BY bucket ORDER BY COUNT(*) DESC, MIN(timestamp), MIN(id)) AS rank,
+                   MIN(MIN(timestamp)) OVER (PARTITION BY bucket) AS timestamp,
+                   SUM(COUNT(*)) OVER (PARTITION BY bucket) AS samples
+            FROM (
+                SELECT CAST((strftime('%s', timestamp) - strftime('%s', ?)) / ? AS INTEGER) AS bucket,
+                       id, emotion_label, confidence, timestamp
+                FROM emotion_timeline
+                WHERE interview_id = ?
+            )
+            GROUP BY bucket, emotion_label
+        )
+        WHERE rank = 1
+        ORDER BY bucket
+    ''', (first_seen, resolution, interview_id))
+    return cursor.fetchall()
+
+def get_minute_timeline(cursor, interview_id):
+    """Dominant emotion per minute of an interview whose raw telemetry was compacted"""
+    cursor.execute('''
+        SELECT label AS emotion_label, confidence, minute AS timestamp, samples
+        FROM (
+            SELECT minute, label, confidence_sum / count AS confidence,
+                   ROW_NUMBER() OVER (PARTITION BY minute ORDER BY count DESC, label) AS rank,
+                   SUM(count) OVER (PARTITION BY minute) AS samples
+            FROM telemetry_minutes
+            WHERE interview_id = ? AND kind = 'emotion'
+        )
+        WHERE rank = 1
+        ORDER BY minute
+    ''', (interview_id,))
+    return cursor.fetchall()
 
 def init_db():
     """Initialize database with all required tables"""
@@ -91,8 +509,23 @@ def init_db():
     ''')
 
     conn.commit()
+
+    run_migrations(conn)
     conn.close()
     print(f"Database initialized at {DATABASE_PATH}")
 
 if __name__ == '__main__':
     init_db()
+
+    # python database.py --check-plans
+    if '--check-plans' in sys.argv:
+        conn = get_db_connection()
+        results = check_query_plans(conn)
+        conn.close()
+
+        for name, plan, uses_index in results:
+            print(f"[{'OK' if uses_index else 'FULL SCAN'}] {name}")
+            for detail in plan:
+                print(f"    {detail}")
+
+        sys.exit(0 if all(uses_index for _, _, uses_index in results) else 1)
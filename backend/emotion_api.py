@@ -1,11 +1,64 @@
 from flask import Blueprint, request, jsonify, session
+from flask_sock import Sock
 from functools import wraps
 from database import get_db_connection
-import cv2
-import numpy as np
-from deepface import DeepFace
+from telemetry import telemetry_writer
+from emotion_model import analyze_frame, locate_face, classify_located, classify_faces, get_model, FACE_SIZE, EMOTION_BACKEND
+from emotion_scheduler import BatchScheduler
+from emotion_pool import EmotionWorkerPool, FrameDropped
+from ttl_cache import TTLCache
+import threading
+import struct
+import json
+import time
+import os
+
+# cv2 and numpy are imported where frames are handled, so workers that only
+# serve other blueprints never load the vision stack
 
 emotion = Blueprint('emotion', __name__, url_prefix='/api/emotion')
+sock = Sock()
+
+# Configuration
+# 'batch' groups face crops from all interviews into one model call,
+# 'process' runs them in a pool of worker processes, 'inline' runs per request
+EMOTION_EXECUTION_MODE = os.getenv('EMOTION_EXECUTION_MODE', 'batch')
+EMOTION_BATCH_MAX_SIZE = int(os.getenv('EMOTION_BATCH_MAX_SIZE', 8))
+EMOTION_BATCH_MAX_WAIT_MS = float(os.getenv('EMOTION_BATCH_MAX_WAIT_MS', 50))
+EMOTION_WORKERS = int(os.getenv('EMOTION_WORKERS', 2))
+EMOTION_QUEUE_SIZE = int(os.getenv('EMOTION_QUEUE_SIZE', 16))
+EMOTION_RESULT_TIMEOUT = float(os.getenv('EMOTION_RESULT_TIMEOUT', 10))
+# Frames whose thumbnail differs from the last analysed one by at most this
+# mean gray level (0-255) reuse its result; 0 disables the dedup cache
+EMOTION_DEDUP_DISTANCE = float(os.getenv('EMOTION_DEDUP_DISTANCE', 4))
+EMOTION_DEDUP_TTL = float(os.getenv('EMOTION_DEDUP_TTL', 10))
+EMOTION_STATE_MAX_INTERVIEWS = int(os.getenv('EMOTION_STATE_MAX_INTERVIEWS', 512))
+EMOTION_STATE_TTL = float(os.getenv('EMOTION_STATE_TTL', 300))
+# Expose internal counters at the /stats endpoints (logged-in users only); off in production
+STATS_ENABLED = os.getenv('STATS_ENABLED', 'false').lower() == 'true'
+SIGNATURE_SIZE = 16
+
+# Frame payloads: an encoded image, a raw grayscale or RGB buffer with declared
+# dimensions, or a grayscale face crop already cut out by the client
+FRAME_FORMATS = {'jpeg': 0, 'gray': 1, 'rgb': 2, 'face': 3}
+FRAME_FORMAT_NAMES = {code: name for name, code in FRAME_FORMATS.items()}
+MAX_RAW_DIMENSION = 1920
+
+# Streamed frames: payload length, format code, width, height, then the payload
+FRAME_HEADER = struct.Struct('>IBHH')
+
+scheduler = BatchScheduler(
+    run_batch=classify_located,
+    max_batch_size=EMOTION_BATCH_MAX_SIZE,
+    max_wait_ms=EMOTION_BATCH_MAX_WAIT_MS
+)
+
+worker_pool = EmotionWorkerPool(
+    task=analyze_frame,
+    initializer=get_model,
+    workers=EMOTION_WORKERS,
+    queue_size=EMOTION_QUEUE_SIZE
+)
 
 def require_auth(f):
     """Decorator to check if user is logged in"""
@@ -16,11 +69,210 @@ def require_auth(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# Last tracked face box per interview, so the detector doesn't run on every frame
+face_tracks = TTLCache(max_entries=EMOTION_STATE_MAX_INTERVIEWS, ttl_seconds=EMOTION_STATE_TTL)
+tracking_stats = {'detected': 0, 'tracked': 0, 'client_crops': 0}
+_tracking_lock = threading.Lock()
+
+# Signature and result of the last analysed frame per interview
+frame_cache = TTLCache(max_entries=EMOTION_STATE_MAX_INTERVIEWS, ttl_seconds=EMOTION_DEDUP_TTL)
+dedup_stats = {'hits': 0, 'misses': 0}
+_dedup_lock = threading.Lock()
+
+def frame_signature(img_array):
+    """Cheap frame signature: a tiny grayscale thumbnail"""
+    import cv2
+    import numpy as np
+    gray = img_array if img_array.ndim == 2 else cv2.cvtColor(img_array, cv2.COLOR_BGR2GRAY)
+    thumbnail = cv2.resize(gray, (SIGNATURE_SIZE, SIGNATURE_SIZE), interpolation=cv2.INTER_AREA)
+    return thumbnail.astype(np.int16)
+
+def lookup_cached_emotion(interview_id, signature):
+    """Return the last (emotion, confidence) if the new frame is nearly identical"""
+    import numpy as np
+    cached = frame_cache.get(interview_id)
+    hit = (
+        cached is not None and
+        np.mean(np.abs(signature - cached['signature'])) <= EMOTION_DEDUP_DISTANCE
+    )
+
+    with _dedup_lock:
+        dedup_stats['hits' if hit else 'misses'] += 1
+
+    return (cached['emotion'], cached['confidence']) if hit else None
+
+def run_inference(interview_id, img_array, is_face_crop=False):
+    """Return (dominant_emotion, confidence) using the configured execution mode"""
+    track = None if is_face_crop else face_tracks.get(interview_id)
+
+    if EMOTION_EXECUTION_MODE == 'batch':
+        # Detection runs in the request thread, only the 48x48 crops are batched
+        future = scheduler.submit(locate_face(img_array, track, is_face_crop))
+        dominant_emotion, confidence, track = future.result(timeout=EMOTION_RESULT_TIMEOUT)
+    elif EMOTION_EXECUTION_MODE == 'process':
+        future = worker_pool.submit(interview_id, (img_array, track, is_face_crop))
+        dominant_emotion, confidence, track = future.result(timeout=EMOTION_RESULT_TIMEOUT)
+    else:
+        dominant_emotion, confidence, track = analyze_frame(img_array, track, is_face_crop)
+
+    with _tracking_lock:
+        if is_face_crop:
+            # The client already located the face, tracking state is left alone
+            tracking_stats['client_crops'] += 1
+        elif track is None:
+            face_tracks.pop(interview_id, None)
+        else:
+            face_tracks.set(interview_id, track)
+        if track is not None and track['frames'] > 0:
+            tracking_stats['tracked'] += 1
+        else:
+            tracking_stats['detected'] += 1
+
+    return dominant_emotion, confidence
+
+def warm_up():
+    """Load the vision stack and the model now instead of on the first frame.
+
+    Returns the seconds it took. In 'process' mode the worker processes are
+    started, each loading the model in its initializer.
+    """
+    import numpy as np
+
+    started = time.perf_counter()
+    if EMOTION_EXECUTION_MODE == 'process':
+        worker_pool.warm_up()
+    else:
+        # One prediction also builds the model's inference function
+        classify_faces([np.zeros((FACE_SIZE, FACE_SIZE), np.float32)])
+    return time.perf_counter() - started
+
+def release_interview(interview_id):
+    """Drop per-interview emotion state once the interview has ended"""
+    face_tracks.pop(str(interview_id), None)
+    frame_cache.pop(str(interview_id), None)
+
+def no_face_result():
+    """Response body used whenever no emotion could be produced for a frame"""
+    return {
+        'success': True,
+        'emotion': 'no_face',
+        'confidence': 0
+    }
+
+def decode_frame(data, frame_format='jpeg', width=0, height=0):
+    """Turn a frame payload into an image array, or None if it is invalid"""
+    import cv2
+    import numpy as np
+
+    if frame_format == 'jpeg':
+        file_bytes = np.frombuffer(data, np.uint8)
+        return cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
+
+    if frame_format not in FRAME_FORMATS:
+        return None
+    if not (0 < width <= MAX_RAW_DIMENSION and 0 < height <= MAX_RAW_DIMENSION):
+        return None
+
+    channels = 3 if frame_format == 'rgb' else 1
+    if len(data) != width * height * channels:
+        return None
+
+    # Raw buffers are wrapped as-is, no decode or copy
+    pixels = np.frombuffer(data, np.uint8)
+    if channels == 1:
+        return pixels.reshape(height, width)
+
+    # The vision stack works in BGR order
+    return cv2.cvtColor(pixels.reshape(height, width, 3), cv2.COLOR_RGB2BGR)
+
+def process_frame(interview_id, img_array, is_face_crop=False):
+    """Detect emotion in a decoded frame, record it and return the response body"""
+    # Nearly identical to the last analysed frame - reuse its result
+    signature = frame_signature(img_array) if EMOTION_DEDUP_DISTANCE > 0 else None
+    cached = lookup_cached_emotion(interview_id, signature) if signature is not None else None
+
+    # Resize image for faster processing (max 640x480)
+    height, width = img_array.shape[:2]
+    if width > 640:
+        scale = 640 / width
+        new_width = 640
+        new_height = int(height * scale)
+        import cv2
+        img_array = cv2.resize(img_array, (new_width, new_height))
+
+    # Try to detect emotion with the emotion model
+    try:
+        if cached is not None:
+            dominant_emotion, confidence = cached
+        else:
+            dominant_emotion, confidence = run_inference(interview_id, img_array, is_face_crop)
+            if signature is not None:
+                frame_cache.set(interview_id, {
+                    'signature': signature,
+                    'emotion': dominant_emotion,
+                    'confidence': confidence
+                })
+
+        # Save emotion to database (written in batches by the telemetry writer)
+        telemetry_writer.add_emotion(interview_id, dominant_emotion, confidence)
+
+        return {
+            'success': True,
+            'emotion': dominant_emotion,
+            'confidence': round(confidence, 1)
+        }
+
+    except FrameDropped:
+        # Shed under load - the client keeps showing its last emotion
+        return no_face_result()
+
+    except Exception as deepface_error:
+        # If DeepFace fails (no face detected, etc.), return gracefully
+        print(f"DeepFace error: {str(deepface_error)}")
+        return no_face_result()
+
+def split_frames(message):
+    """Split a stream message into (format, width, height, payload) frames"""
+    frames = []
+    offset = 0
+    while offset < len(message):
+        if offset + FRAME_HEADER.size > len(message):
+            raise ValueError('Truncated frame header')
+        length, format_code, width, height = FRAME_HEADER.unpack_from(message, offset)
+        offset += FRAME_HEADER.size
+        if offset + length > len(message):
+            raise ValueError('Truncated frame payload')
+        if format_code not in FRAME_FORMAT_NAMES:
+            raise ValueError('Unknown frame format')
+        payload = memoryview(message)[offset:offset + length]
+        frames.append((FRAME_FORMAT_NAMES[format_code], width, height, payload))
+        offset += length
+    return frames
+
 @emotion.route('/detect', methods=['POST'])
 @require_auth
 def detect_emotion():
     """Detect emotion from webcam frame"""
     try:
+        # Compact binary payload: raw body with metadata in the query string
+        if request.mimetype == 'application/octet-stream':
+            interview_id = request.args.get('interview_id')
+            if not interview_id:
+                return jsonify({'error': 'Interview ID required'}), 400
+
+            frame_format = request.args.get('format', 'gray')
+            img_array = decode_frame(
+                request.get_data(cache=False),
+                frame_format,
+                request.args.get('width', 0, type=int),
+                request.args.get('height', 0, type=int)
+            )
+
+            if img_array is None:
+                return jsonify({'error': 'Invalid image data'}), 400
+
+            return jsonify(process_frame(interview_id, img_array, frame_format == 'face')), 200
+
         # Check if frame and interview_id are in request
         if 'frame' not in request.files:
             return jsonify({'error': 'Frame image required'}), 400
@@ -32,70 +284,95 @@ def detect_emotion():
         interview_id = request.form.get('interview_id')
 
         # Read image file
-        file_bytes = np.frombuffer(frame_file.read(), np.uint8)
-        img_array = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
+        img_array = decode_frame(frame_file.read())
 
         if img_array is None:
             return jsonify({'error': 'Invalid image data'}), 400
 
-        # Resize image for faster processing (max 640x480)
-        height, width = img_array.shape[:2]
-        if width > 640:
-            scale = 640 / width
-            new_width = 640
-            new_height = int(height * scale)
-            img_array = cv2.resize(img_array, (new_width, new_height))
+        return jsonify(process_frame(interview_id, img_array)), 200
 
-        # Try to detect emotion using DeepFace
-        try:
-            result = DeepFace.analyze(
-                img_array,
-                actions=['emotion'],
-                enforce_detection=False,
-                silent=True
-            )
+    except Exception as e:
+        print(f"Emotion detection error: {str(e)}")
+        # Don't crash interview - return gracefully
+        return jsonify(no_face_result()), 200
 
-            # Handle result (DeepFace can return list or dict)
-            if isinstance(result, list):
-                result = result[0]
+@sock.route('/stream/<int:interview_id>', bp=emotion)
+def stream_frames(ws, interview_id):
+    """Long-lived frame channel for one interview, results are pushed back as JSON"""
+    user_id = session.get('user_id')
+    if not user_id:
+        ws.close(reason=1008, message='Authentication required')
+        return
 
-            # Extract dominant emotion and confidence
-            dominant_emotion = result.get('dominant_emotion', 'neutral')
-            emotion_scores = result.get('emotion', {})
-            confidence = emotion_scores.get(dominant_emotion, 0)
+    # Session and ownership are checked once for the whole channel
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT user_id FROM interviews WHERE id = ?', (interview_id,))
+    interview = cursor.fetchone()
+    conn.close()
 
-            # Save emotion to database
-            conn = get_db_connection()
-            cursor = conn.cursor()
+    if not interview or interview['user_id'] != user_id:
+        ws.close(reason=1008, message='Access denied')
+        return
 
-            cursor.execute(
-                'INSERT INTO emotion_timeline (interview_id, emotion_label, confidence) VALUES (?, ?, ?)',
-                (interview_id, dominant_emotion, confidence)
-            )
-            conn.commit()
-            conn.close()
+    interview_key = str(interview_id)
+    while True:
+        message = ws.receive()
+        if message is None:
+            break
+        if isinstance(message, str):
+            # 'end' is sent before /end, which may run in another worker: write out
+            # this worker's buffered samples so /end summarizes all of them
+            if message == 'end':
+                telemetry_writer.flush()
+                release_interview(interview_key)
+                ws.send(json.dumps({'ended': True}))
+            continue
 
-            return jsonify({
-                'success': True,
-                'emotion': dominant_emotion,
-                'confidence': round(confidence, 1)
-            }), 200
+        try:
+            frames = split_frames(message)
+        except ValueError as e:
+            ws.send(json.dumps({'error': str(e)}))
+            continue
 
-        except Exception as deepface_error:
-            # If DeepFace fails (no face detected, etc.), return gracefully
-            print(f"DeepFace error: {str(deepface_error)}")
+        for frame_format, width, height, payload in frames:
+            try:
+                img_array = decode_frame(payload, frame_format, width, height)
+                if img_array is None:
+                    ws.send(json.dumps({'error': 'Invalid image data'}))
+                    continue
+                ws.send(json.dumps(process_frame(interview_key, img_array, frame_format == 'face')))
+            except Exception as e:
+                print(f"Emotion stream error: {str(e)}")
+                ws.send(json.dumps(no_face_result()))
 
-            return jsonify({
-                'success': True,
-                'emotion': 'no_face',
-                'confidence': 0
-            }), 200
+def frame_cache_stats():
+    """Dedup hit rate plus eviction counters of the frame cache"""
+    cache_stats = frame_cache.stats()
+    with _dedup_lock:
+        lookups = dedup_stats['hits'] + dedup_stats['misses']
+        return {
+            'entries': cache_stats['entries'],
+            'hits': dedup_stats['hits'],
+            'misses': dedup_stats['misses'],
+            'hit_rate': round(dedup_stats['hits'] / lookups, 3) if lookups else 0,
+            'evictions': cache_stats['evictions'],
+            'expirations': cache_stats['expirations']
+        }
 
-    except Exception as e:
-        print(f"Emotion detection error: {str(e)}")
-        # Don't crash interview - return gracefully
-        return jsonify({
-            'success': True,
-            'emotion': 'no_face',
-            'confidence': 0
-        }), 200
+@emotion.route('/stats', methods=['GET'])
+@require_auth
+def get_stats():
+    """Report emotion inference statistics for tuning"""
+    if not STATS_ENABLED:
+        return jsonify({'error': 'Not found'}), 404
+    return jsonify({
+        'success': True,
+        'mode': EMOTION_EXECUTION_MODE,
+        'backend': EMOTION_BACKEND,
+        'batching': scheduler.stats(),
+        'worker_pool': worker_pool.stats(),
+        'tracking': dict(tracking_stats, active=len(face_tracks)),
+        'frame_cache': frame_cache_stats(),
+        'telemetry': telemetry_writer.stats()
+    }), 200
@@ -0,0 +1,168 @@
+import sys
+import os
+
+# All backends take (N, 48, 48, 1) float32 face crops in [0, 1] and return
+# (N, 7) scores in the label order of emotion_model.EMOTION_LABELS. Their
+# libraries are imported in load(), so only the configured one is ever loaded.
+
+# CPU threads for inference; 0 keeps the library default
+EMOTION_INTRA_OP_THREADS = int(os.getenv('EMOTION_INTRA_OP_THREADS', 0))
+EMOTION_INTER_OP_THREADS = int(os.getenv('EMOTION_INTER_OP_THREADS', 0))
+# Classifier exported from the DeepFace model (see export_onnx)
+EMOTION_ONNX_MODEL = os.getenv(
+    'EMOTION_ONNX_MODEL',
+    os.path.join(os.path.dirname(__file__), 'models', 'emotion.onnx')
+)
+
+def detect_with_cascade(color_img):
+    """Locate the largest frontal face with OpenCV's Haar cascade.
+
+    Returns (gray_face_crop, region) with values in [0, 1], or the whole frame
+    and None when no face is found - the same contract as DeepFace's detector.
+    """
+    import cv2
+
+    gray = cv2.cvtColor(color_img, cv2.COLOR_BGR2GRAY)
+    faces = _cascade().detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(40, 40))
+    if len(faces) == 0:
+        return gray / 255.0, None
+
+    x, y, w, h = (int(v) for v in max(faces, key=lambda face: face[2] * face[3]))
+    return gray[y:y + h, x:x + w] / 255.0, {'x': x, 'y': y, 'w': w, 'h': h}
+
+_face_cascade = None
+
+def _cascade():
+    global _face_cascade
+    if _face_cascade is None:
+        import cv2
+        _face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    return _face_cascade
+
+class DeepFaceBackend:
+    """DeepFace's Keras emotion model on TensorFlow, with its aligned face detector"""
+
+    name = 'deepface'
+
+    def __init__(self, intra_op_threads=0, inter_op_threads=0):
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.model = None
+
+    def load(self):
+        import tensorflow as tf
+        from deepface import DeepFace
+
+        # Must be set before TensorFlow runs its first operation
+        if self.intra_op_threads:
+            tf.config.threading.set_intra_op_parallelism_threads(self.intra_op_threads)
+        if self.inter_op_threads:
+            tf.config.threading.set_inter_op_parallelism_threads(self.inter_op_threads)
+        self.model = DeepFace.build_model('Emotion')
+        return self
+
+    def detect(self, color_img):
+        import cv2
+        from deepface.commons import functions
+
+        faces = functions.extract_faces(
+            img=color_img,
+            target_size=(224, 224),
+            detector_backend='opencv',
+            grayscale=False,
+            enforce_detection=False,
+            align=True
+        )
+        face_pixels, region, detection_confidence = faces[0]
+
+        # Same preprocessing DeepFace.analyze applies before the emotion model
+        face_gray = cv2.cvtColor(face_pixels[0], cv2.COLOR_BGR2GRAY)
+        return face_gray, region if detection_confidence else None
+
+    def predict(self, batch):
+        return self.model.predict(batch, verbose=0)
+
+class OnnxBackend:
+    """The exported classifier on ONNX Runtime's CPU provider"""
+
+    name = 'onnx'
+
+    def __init__(self, model_path, intra_op_threads=0, inter_op_threads=0):
+        self.model_path = model_path
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.session = None
+
+    def load(self):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.intra_op_threads
+        options.inter_op_num_threads = self.inter_op_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(self.model_path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        return self
+
+    def detect(self, color_img):
+        return detect_with_cascade(color_img)
+
+    def predict(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+class OpenCVDnnBackend:
+    """The exported classifier on OpenCV's DNN module - no extra dependency"""
+
+    name = 'opencv'
+
+    def __init__(self, model_path, intra_op_threads=0):
+        self.model_path = model_path
+        self.intra_op_threads = intra_op_threads
+        self.net = None
+
+    def load(self):
+        import cv2
+
+        if self.intra_op_threads:
+            cv2.setNumThreads(self.intra_op_threads)
+        self.net = cv2.dnn.readNetFromONNX(self.model_path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        return self
+
+    def detect(self, color_img):
+        return detect_with_cascade(color_img)
+
+    def predict(self, batch):
+        self.net.setInput(batch)
+        return self.net.forward()
+
+def create_backend(name):
+    """Build an unloaded backend by name, using the configured thread settings"""
+    if name == 'deepface':
+        return DeepFaceBackend(EMOTION_INTRA_OP_THREADS, EMOTION_INTER_OP_THREADS)
+    if name == 'onnx':
+        return OnnxBackend(EMOTION_ONNX_MODEL, EMOTION_INTRA_OP_THREADS, EMOTION_INTER_OP_THREADS)
+    if name == 'opencv':
+        return OpenCVDnnBackend(EMOTION_ONNX_MODEL, EMOTION_INTRA_OP_THREADS)
+    raise ValueError(f"Unknown emotion backend: {name}")
+
+def export_onnx(path):
+    """Export DeepFace's emotion model to ONNX for the lightweight backends (needs tf2onnx)"""
+    import tensorflow as tf
+    import tf2onnx
+    from deepface import DeepFace
+
+    model = DeepFace.build_model('Emotion')
+    spec = (tf.TensorSpec((None, 48, 48, 1), tf.float32, name='face'),)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tf2onnx.convert.from_keras(model, input_signature=spec, opset=13, output_path=path)
+    print(f"Exported emotion model to {path}")
+
+if __name__ == '__main__':
+    # python emotion_backends.py --export-onnx [path]
+    if len(sys.argv) >= 2 and sys.argv[1] == '--export-onnx':
+        export_onnx(sys.argv[2] if len(sys.argv) > 2 else EMOTION_ONNX_MODEL)
+    else:
+        print("Usage: python emotion_backends.py --export-onnx [path]")
+        sys.exit(1)
@@ -0,0 +1,139 @@
+from emotion_backends import create_backend
+import threading
+import os
+
+# cv2, numpy and the inference library are imported inside the functions that
+# use them, so importing this module stays cheap until a frame is analysed
+
+# Label order of the DeepFace facial expression model output
+EMOTION_LABELS = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
+
+# Input size of the emotion classifier
+FACE_SIZE = 48
+
+# Inference backend: 'deepface' (TensorFlow), 'onnx' (ONNX Runtime) or 'opencv' (OpenCV DNN)
+EMOTION_BACKEND = os.getenv('EMOTION_BACKEND', 'deepface')
+
+# Face tracking: reuse the last face box until a periodic refresh or a weak match
+TRACK_REFRESH_FRAMES = int(os.getenv('EMOTION_TRACK_REFRESH_FRAMES', 10))
+TRACK_MIN_SCORE = float(os.getenv('EMOTION_TRACK_MIN_SCORE', 0.6))
+TRACK_SEARCH_MARGIN = float(os.getenv('EMOTION_TRACK_SEARCH_MARGIN', 0.5))
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """Load the configured emotion backend once and return it"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = create_backend(EMOTION_BACKEND).load()
+    return _model
+
+def to_gray(img_array):
+    """Return a grayscale view of a BGR or already grayscale frame"""
+    import cv2
+    if img_array.ndim == 2:
+        return img_array
+    return cv2.cvtColor(img_array, cv2.COLOR_BGR2GRAY)
+
+def prepare_face_crop(face_array):
+    """Normalize a client-supplied grayscale face crop to the classifier input"""
+    import cv2
+    import numpy as np
+    if face_array.shape != (FACE_SIZE, FACE_SIZE):
+        face_array = cv2.resize(face_array, (FACE_SIZE, FACE_SIZE))
+    return face_array.astype(np.float32) / 255
+
+def detect_face(img_array):
+    """Run full face detection and return (face_crop, track)"""
+    import cv2
+
+    # The detectors expect three channels
+    color = cv2.cvtColor(img_array, cv2.COLOR_GRAY2BGR) if img_array.ndim == 2 else img_array
+    face_gray, region = get_model().detect(color)
+    face = cv2.resize(face_gray, (FACE_SIZE, FACE_SIZE))
+
+    # No face found - the detector fell back to the whole image, nothing to track
+    if region is None:
+        return face, None
+
+    x, y, w, h = region['x'], region['y'], region['w'], region['h']
+    gray = to_gray(img_array)
+    track = {
+        'box': (x, y, w, h),
+        'template': gray[y:y + h, x:x + w].copy(),
+        'frames': 0,
+        'score': 1.0
+    }
+    return face, track
+
+def follow_face(img_array, track):
+    """Find the tracked face near its last position, or return None if it was lost"""
+    import cv2
+    import numpy as np
+
+    gray = to_gray(img_array)
+    template = track['template']
+    x, y, w, h = track['box']
+    img_h, img_w = gray.shape
+
+    # Search a window around the last box
+    margin_x = int(w * TRACK_SEARCH_MARGIN)
+    margin_y = int(h * TRACK_SEARCH_MARGIN)
+    left, top = max(0, x - margin_x), max(0, y - margin_y)
+    right, bottom = min(img_w, x + w + margin_x), min(img_h, y + h + margin_y)
+    window = gray[top:bottom, left:right]
+
+    if window.shape[0] < template.shape[0] or window.shape[1] < template.shape[1]:
+        return None
+
+    scores = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+    _, score, _, location = cv2.minMaxLoc(scores)
+    if score < TRACK_MIN_SCORE:
+        return None
+
+    new_x, new_y = left + location[0], top + location[1]
+    face = gray[new_y:new_y + h, new_x:new_x + w]
+    face = cv2.resize(face, (FACE_SIZE, FACE_SIZE)).astype(np.float32) / 255
+
+    return face, {
+        'box': (new_x, new_y, w, h),
+        'template': template,
+        'frames': track['frames'] + 1,
+        'score': float(score)
+    }
+
+def locate_face(img_array, track=None, is_face_crop=False):
+    """Return (face_crop, track), running the detector only when tracking can't be used"""
+    if is_face_crop:
+        return prepare_face_crop(img_array), track
+    if track is not None and track['frames'] < TRACK_REFRESH_FRAMES:
+        followed = follow_face(img_array, track)
+        if followed is not None:
+            return followed
+    return detect_face(img_array)
+
+def classify_faces(faces):
+    """Run the emotion model once over a list of face crops"""
+    import numpy as np
+
+    batch = np.stack(faces).astype(np.float32)[..., np.newaxis]
+    predictions = get_model().predict(batch)
+
+    results = []
+    for scores in predictions:
+        scores = 100 * scores / scores.sum()
+        best = int(np.argmax(scores))
+        results.append((EMOTION_LABELS[best], float(scores[best])))
+    return results
+
+def classify_located(located):
+    """Classify a list of (face_crop, track) pairs, returning (emotion, confidence, track)"""
+    results = classify_faces([face for face, _ in located])
+    return [(label, confidence, track) for (label, confidence), (_, track) in zip(results, located)]
+
+def analyze_frame(img_array, track=None, is_face_crop=False):
+    """Return (dominant_emotion, confidence, track) for a single frame"""
+    return classify_located([locate_face(img_array, track, is_face_crop)])[0]
@@ -0,0 +1,137 @@
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from collections import OrderedDict
+import multiprocessing
+import threading
+import os
+
+class FrameDropped(Exception):
+    """Raised for frames that were shed or replaced before reaching a worker"""
+    pass
+
+class EmotionWorkerPool:
+    """Run emotion inference in a fixed set of worker processes behind a bounded queue"""
+
+    def __init__(self, task, initializer=None, workers=2, queue_size=16):
+        # task and initializer must be importable module-level functions
+        self.task = task
+        self.initializer = initializer
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+
+        # At most one waiting frame per interview, oldest first
+        self._pending = OrderedDict()
+        self._cond = threading.Condition()
+        self._free_slots = self.workers
+        self._executor = None
+        self._thread = None
+
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._shed = 0
+        self._replaced = 0
+
+    def submit(self, key, args):
+        """Queue task arguments for an interview without blocking the caller"""
+        future = Future()
+
+        with self._cond:
+            self._ensure_started()
+            self._submitted += 1
+
+            if key in self._pending:
+                # Newer frame from the same interview - the waiting one is stale
+                _, stale_future = self._pending.pop(key)
+                stale_future.set_exception(FrameDropped('Replaced by a newer frame'))
+                self._replaced += 1
+            elif len(self._pending) >= self.queue_size:
+                self._shed += 1
+                future.set_exception(FrameDropped('Emotion queue is full'))
+                return future
+
+            self._pending[key] = (args, future)
+            self._cond.notify()
+
+        return future
+
+    def warm_up(self):
+        """Start the worker processes now so their initializer runs before the first frame"""
+        with self._cond:
+            self._ensure_started()
+            executor = self._executor
+        # Processes are spawned on demand, one per task while none is idle
+        wait([executor.submit(os.getpid) for _ in range(self.workers)])
+
+    def _ensure_started(self):
+        if self._thread is None:
+            self._executor = self._create_executor()
+            self._thread = threading.Thread(
+                target=self._dispatch, name='emotion-pool-dispatch', daemon=True
+            )
+            self._thread.start()
+
+    def _create_executor(self):
+        # Spawn so workers don't inherit the parent's TensorFlow state
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=self.initializer
+        )
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                while not self._pending or self._free_slots == 0:
+                    self._cond.wait()
+                _, (args, future) = self._pending.popitem(last=False)
+                self._free_slots -= 1
+
+            try:
+                worker_future = self._executor.submit(self.task, *args)
+            except BrokenProcessPool as e:
+                print(f"Emotion worker pool broken, restarting: {str(e)}")
+                self._executor = self._create_executor()
+                self._finish(future, error=e)
+                continue
+
+            worker_future.add_done_callback(
+                lambda done, future=future: self._on_worker_done(done, future)
+            )
+
+    def _on_worker_done(self, worker_future, future):
+        try:
+            result = worker_future.result()
+        except Exception as e:
+            self._finish(future, error=e)
+            return
+        self._finish(future, result=result)
+
+    def _finish(self, future, result=None, error=None):
+        with self._cond:
+            self._free_slots += 1
+            if error is None:
+                self._completed += 1
+            else:
+                self._failed += 1
+            self._cond.notify()
+
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    def stats(self):
+        """Return queue and backpressure statistics"""
+        with self._cond:
+            return {
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'queued': len(self._pending),
+                'in_flight': self.workers - self._free_slots,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'shed': self._shed,
+                'replaced': self._replaced
+            }
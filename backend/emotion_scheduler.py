@@ -0,0 +1,117 @@
+from concurrent.futures import Future
+from collections import deque
+import threading
+import queue
+import time
+
+class BatchScheduler:
+    """Collect face crops from all live interviews and run the model once per batch"""
+
+    def __init__(self, run_batch, max_batch_size=8, max_wait_ms=50):
+        # run_batch(items) runs once per batch and returns one result per item;
+        # per-frame work (face detection) is done by the callers before submit
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0, max_wait_ms) / 1000.0
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        # Tuning statistics
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._frames = 0
+        self._failed = 0
+        self._batch_sizes = {}
+        self._recent_waits = deque(maxlen=1000)
+        self._total_wait = 0.0
+        self._max_wait_seen = 0.0
+
+    def submit(self, item):
+        """Queue an item and return a Future resolved with its result"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((item, future, time.monotonic()))
+        return future
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name='emotion-batcher', daemon=True
+                    )
+                    self._thread.start()
+
+    def _collect_batch(self):
+        """Block for the first item, then gather more until full or the wait expires"""
+        batch = [self._queue.get()]
+        deadline = batch[0][2] + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            dispatched_at = time.monotonic()
+
+            failed = 0
+            try:
+                results = self.run_batch([item for item, _, _ in batch])
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                failed = len(batch)
+                for _, future, _ in batch:
+                    future.set_exception(e)
+
+            self._record(batch, dispatched_at, failed)
+
+    def _record(self, batch, dispatched_at, failed):
+        waits = [dispatched_at - enqueued_at for _, _, enqueued_at in batch]
+        with self._stats_lock:
+            self._batches += 1
+            self._frames += len(batch)
+            self._failed += failed
+            self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+            self._recent_waits.extend(waits)
+            self._total_wait += sum(waits)
+            self._max_wait_seen = max(self._max_wait_seen, max(waits))
+
+    def stats(self):
+        """Return batch-size and queue-wait statistics"""
+        with self._stats_lock:
+            recent = sorted(self._recent_waits)
+
+            def percentile(p):
+                if not recent:
+                    return 0.0
+                return round(recent[min(len(recent) - 1, int(p * len(recent)))] * 1000, 2)
+
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'queued': self._queue.qsize(),
+                'batches': self._batches,
+                'frames': self._frames,
+                'failed_frames': self._failed,
+                'avg_batch_size': round(self._frames / self._batches, 2) if self._batches else 0,
+                'batch_size_histogram': dict(sorted(self._batch_sizes.items())),
+                'queue_wait_ms': {
+                    'avg': round(self._total_wait / self._frames * 1000, 2) if self._frames else 0,
+                    'p50': percentile(0.5),
+                    'p95': percentile(0.95),
+                    'max': round(self._max_wait_seen * 1000, 2)
+                }
+            }
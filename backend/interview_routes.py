@@ -1,15 +1,37 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, Response, stream_with_context
 from functools import wraps
-from database import get_db_connection
-from datetime import datetime
+from database import (
+    get_db_connection, get_label_counts, get_dominant_label,
+    get_timeline_span, get_bucketed_timeline, get_minute_timeline
+)
+from emotion_api import release_interview
+from telemetry import telemetry_writer
+from review_store import review_store
+from timeline_store import load_packed_timeline, pack_interview_timeline
+from question_generator import (
+    generate_question_text, stream_question_text, generate_question_plan,
+    question_prefetcher, conversation_store,
+    QUESTION_PREFETCH, QUESTION_MODE, QUESTION_CONTEXT, MAX_QUESTIONS
+)
+from datetime import datetime, timezone
 import requests
+import hashlib
+import base64
+import json
+import math
 import os
 
 interview = Blueprint('interview', __name__, url_prefix='/api/interview')
 
-# Configuration
-OLLAMA_API_URL = os.getenv('OLLAMA_API_URL', 'http://localhost:11434/api/generate')
-OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'llama2')
+# /history page sizes
+HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', 20))
+HISTORY_MAX_PAGE_SIZE = int(os.getenv('HISTORY_MAX_PAGE_SIZE', 100))
+# Upper bound on /details emotion timeline points; longer timelines are bucketed
+TIMELINE_MAX_POINTS = int(os.getenv('TIMELINE_MAX_POINTS', 600))
+# Timeline points in the review stored at /end; matches what the history page asks for
+REVIEW_TIMELINE_POINTS = min(int(os.getenv('REVIEW_TIMELINE_POINTS', 120)), TIMELINE_MAX_POINTS)
+# Posture events accepted per /save-posture/batch request
+POSTURE_BATCH_MAX_EVENTS = int(os.getenv('POSTURE_BATCH_MAX_EVENTS', 500))
 
 def require_auth(f):
     """Decorator to check if user is logged in"""
@@ -35,23 +57,26 @@ def start_interview():
         if not job_role:
             return jsonify({'error': 'Job role is required'}), 400
 
+        question_mode = data.get('question_mode', QUESTION_MODE)
+        if question_mode not in ('incremental', 'plan'):
+            return jsonify({'error': 'Invalid question mode'}), 400
+
         user_id = session.get('user_id')
 
         # Create new interview record
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        interview_id = create_interview(user_id, job_role)
 
-        cursor.execute(
-            'INSERT INTO interviews (user_id, job_role, status) VALUES (?, ?, ?)',
-            (user_id, job_role, 'ongoing')
-        )
-        interview_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        # Plan mode: generate every question now and store them, not yet asked
+        planned_questions = 0
+        if question_mode == 'plan':
+            plan = generate_question_plan(interview_id, job_role, MAX_QUESTIONS)
+            planned_questions = store_question_plan(interview_id, plan)
 
         return jsonify({
             'success': True,
             'interview_id': interview_id,
+            'question_mode': question_mode,
+            'planned_questions': planned_questions,
             'message': 'Interview started'
         }), 201
 
@@ -59,6 +84,101 @@ def start_interview():
         print(f"Start interview error: {str(e)}")
         return jsonify({'error': 'Failed to start interview'}), 500
 
+def create_interview(user_id, job_role):
+    """Insert an ongoing interview and return its id"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(
+        'INSERT INTO interviews (user_id, job_role, status) VALUES (?, ?, ?)',
+        (user_id, job_role, 'ongoing')
+    )
+    interview_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+
+    return interview_id
+
+def store_question_plan(interview_id, plan):
+    """Store planned questions as not yet asked and return how many were stored"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.executemany(
+        'INSERT INTO interview_questions (interview_id, question_text, question_number, asked_at) VALUES (?, ?, ?, NULL)',
+        [(interview_id, question_text, number) for number, question_text in sorted(plan.items())]
+    )
+    conn.commit()
+    conn.close()
+
+    return len(plan)
+
+def save_question(interview_id, question_text, question_number):
+    """Store an asked question and return its id"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(
+        'INSERT INTO interview_questions (interview_id, question_text, question_number) VALUES (?, ?, ?)',
+        (interview_id, question_text, question_number)
+    )
+    question_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+
+    return question_id
+
+def take_planned_question(interview_id, question_number):
+    """Mark a question stored by plan mode as asked and return (question_id, text), or None"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        SELECT id, question_text
+        FROM interview_questions
+        WHERE interview_id = ? AND question_number = ? AND asked_at IS NULL
+        ORDER BY id
+        LIMIT 1
+    ''', (interview_id, question_number))
+    question = cursor.fetchone()
+
+    if not question:
+        conn.close()
+        return None
+
+    cursor.execute(
+        'UPDATE interview_questions SET asked_at = CURRENT_TIMESTAMP WHERE id = ?',
+        (question['id'],)
+    )
+    conn.commit()
+    conn.close()
+
+    return question['id'], question['question_text']
+
+def get_previous_answer(interview_id, question_number):
+    """Return the answer given to the question before question_number, or None"""
+    if question_number <= 1:
+        return None
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT a.answer_text
+        FROM interview_questions q
+        JOIN interview_answers a ON q.id = a.question_id
+        WHERE q.interview_id = ? AND q.question_number = ?
+        ORDER BY a.id DESC
+        LIMIT 1
+    ''', (interview_id, question_number - 1))
+    answer = cursor.fetchone()
+    conn.close()
+
+    return answer['answer_text'] if answer else None
+
+def sse_event(event, payload):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
 @interview.route('/generate-question', methods=['POST'])
 @require_auth
 def generate_question():
@@ -76,61 +196,37 @@ def generate_question():
         if not interview_id or not job_role or not question_number:
             return jsonify({'error': 'Missing required fields'}), 400
 
-        # Generate question using Ollama
-        prompt = f"""You are an experienced interviewer conducting a job interview for the position of {job_role}.
-This is question number {question_number} of the interview.
-Generate a single relevant interview question.
-Only return the question text, nothing else."""
-
+        # Interviews started in plan mode already have their questions stored
+        planned = take_planned_question(interview_id, question_number)
+        if planned is not None:
+            question_id, question_text = planned
+            return jsonify({
+                'success': True,
+                'question': question_text,
+                'question_id': question_id
+            }), 200
+
+        # Use the question generated in the background if there is one
         try:
-            ollama_response = requests.post(
-                OLLAMA_API_URL,
-                json={
-                    'model': OLLAMA_MODEL,
-                    'prompt': prompt,
-                    'stream': False
-                },
-                timeout=30
-            )
-            ollama_response.raise_for_status()
-
-            question_text = ollama_response.json().get('response', '').strip()
-
-            if not question_text:
-                question_text = f"Tell me about your experience relevant to {job_role}."
+            question_text = None
+            if QUESTION_PREFETCH:
+                question_text = question_prefetcher.take(interview_id, job_role, question_number)
+            if question_text is None:
+                previous_answer = get_previous_answer(interview_id, question_number) if QUESTION_CONTEXT else None
+                question_text = generate_question_text(interview_id, job_role, question_number, previous_answer)
 
         except requests.exceptions.ConnectionError:
             return jsonify({'error': 'AI service unavailable. Please ensure Ollama is running.'}), 503
         except requests.exceptions.Timeout:
             return jsonify({'error': 'AI service timeout. Please try again.'}), 503
-        except Exception as e:
-            print(f"Ollama error: {str(e)}")
-            # Fallback to generic questions
-            fallback_questions = [
-                f"Tell me about yourself and your experience with {job_role}.",
-                "What are your greatest strengths?",
-                "What are your biggest weaknesses?",
-                f"Why do you want to work as a {job_role}?",
-                "Describe a challenging project you've worked on.",
-                "Where do you see yourself in 5 years?",
-                "How do you handle stress and pressure?",
-                "What motivates you in your work?",
-                "Tell me about a time you worked in a team.",
-                "Do you have any questions for us?"
-            ]
-            question_text = fallback_questions[min(question_number - 1, len(fallback_questions) - 1)]
 
         # Save question to database
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        question_id = save_question(interview_id, question_text, question_number)
 
-        cursor.execute(
-            'INSERT INTO interview_questions (interview_id, question_text, question_number) VALUES (?, ?, ?)',
-            (interview_id, question_text, question_number)
-        )
-        question_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        # Start generating the next question while this one is being answered;
+        # a conversation has to wait for the answer (see save_answer)
+        if QUESTION_PREFETCH and not QUESTION_CONTEXT:
+            question_prefetcher.prefetch(interview_id, job_role, question_number + 1)
 
         return jsonify({
             'success': True,
@@ -142,6 +238,96 @@ Only return the question text, nothing else."""
         print(f"Generate question error: {str(e)}")
         return jsonify({'error': 'Failed to generate question'}), 500
 
+@interview.route('/generate-question/stream', methods=['POST'])
+@require_auth
+def generate_question_stream():
+    """Generate next interview question, streaming its tokens as Server-Sent Events"""
+    try:
+        data = request.get_json()
+
+        if not data:
+            return jsonify({'error': 'Invalid request data'}), 400
+
+        interview_id = data.get('interview_id')
+        job_role = data.get('job_role', '').strip()
+        question_number = data.get('question_number')
+
+        if not interview_id or not job_role or not question_number:
+            return jsonify({'error': 'Missing required fields'}), 400
+
+        # Interviews started in plan mode already have their questions stored
+        planned = take_planned_question(interview_id, question_number)
+        if planned is not None:
+            question_id, question_text = planned
+
+            def planned_events():
+                yield sse_event('token', {'text': question_text})
+                yield sse_event('done', {
+                    'success': True,
+                    'question': question_text,
+                    'question_id': question_id
+                })
+
+            return Response(
+                planned_events(),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+
+        # A question generated in the background is sent as a single chunk
+        try:
+            question_text = None
+            if QUESTION_PREFETCH:
+                question_text = question_prefetcher.take(interview_id, job_role, question_number)
+            if question_text is not None:
+                tokens = iter([question_text])
+            else:
+                previous_answer = get_previous_answer(interview_id, question_number) if QUESTION_CONTEXT else None
+                tokens = stream_question_text(interview_id, job_role, question_number, previous_answer)
+
+        except requests.exceptions.ConnectionError:
+            return jsonify({'error': 'AI service unavailable. Please ensure Ollama is running.'}), 503
+        except requests.exceptions.Timeout:
+            return jsonify({'error': 'AI service timeout. Please try again.'}), 503
+
+        def events():
+            parts = []
+            for token in tokens:
+                parts.append(token)
+                yield sse_event('token', {'text': token})
+
+            question_text = ''.join(parts).strip()
+            if not question_text:
+                question_text = f"Tell me about your experience relevant to {job_role}."
+                yield sse_event('token', {'text': question_text})
+
+            # The full text is stored once the stream has finished
+            try:
+                question_id = save_question(interview_id, question_text, question_number)
+            except Exception as e:
+                print(f"Generate question stream error: {str(e)}")
+                yield sse_event('error', {'error': 'Failed to generate question'})
+                return
+
+            if QUESTION_PREFETCH and not QUESTION_CONTEXT:
+                question_prefetcher.prefetch(interview_id, job_role, question_number + 1)
+
+            yield sse_event('done', {
+                'success': True,
+                'question': question_text,
+                'question_id': question_id
+            })
+
+        return Response(
+            stream_with_context(events()),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+    except Exception as e:
+        print(f"Generate question error: {str(e)}")
+        return jsonify({'error': 'Failed to generate question'}), 500
+
 @interview.route('/save-answer', methods=['POST'])
 @require_auth
 def save_answer():
@@ -165,7 +351,12 @@ def save_answer():
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        cursor.execute('SELECT id FROM interview_questions WHERE id = ?', (question_id,))
+        cursor.execute('''
+            SELECT q.id, q.interview_id, q.question_number, i.job_role
+            FROM interview_questions q
+            JOIN interviews i ON q.interview_id = i.id
+            WHERE q.id = ?
+        ''', (question_id,))
         question = cursor.fetchone()
 
         if not question:
@@ -178,6 +369,18 @@ def save_answer():
             (question_id, answer_text)
         )
         conn.commit()
+
+        # A conversation's next question depends on this answer, so it is
+        # prefetched now unless plan mode already stored it
+        next_number = question['question_number'] + 1
+        if QUESTION_PREFETCH and QUESTION_CONTEXT and next_number <= MAX_QUESTIONS:
+            cursor.execute(
+                'SELECT 1 FROM interview_questions WHERE interview_id = ? AND question_number = ? AND asked_at IS NULL',
+                (question['interview_id'], next_number)
+            )
+            if not cursor.fetchone():
+                question_prefetcher.prefetch(question['interview_id'], question['job_role'], next_number, answer_text)
+
         conn.close()
 
         return jsonify({
@@ -205,16 +408,8 @@ def save_posture():
         if not interview_id or not posture_label:
             return jsonify({'error': 'Interview ID and posture label required'}), 400
 
-        # Insert posture event
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
-            'INSERT INTO posture_events (interview_id, posture_label) VALUES (?, ?)',
-            (interview_id, posture_label)
-        )
-        conn.commit()
-        conn.close()
+        # Queue posture event (written in batches by the telemetry writer)
+        telemetry_writer.add_posture(interview_id, posture_label)
 
         return jsonify({
             'success': True,
@@ -225,6 +420,76 @@ def save_posture():
         print(f"Save posture error: {str(e)}")
         return jsonify({'error': 'Failed to save posture'}), 500
 
+def coalesce_posture_events(events, until=None):
+    """Merge runs of the same label into (label, start_ms, duration_seconds) intervals.
+
+    A run lasts until the next different label. The last run ends at until, or
+    is left out when until is None because it may continue in the next batch.
+    """
+    intervals = []
+    run_label, run_start = None, None
+    for label, at in sorted(events, key=lambda event: event[1]):
+        if label == run_label:
+            continue
+        if run_label is not None:
+            intervals.append((run_label, run_start, (at - run_start) / 1000))
+        run_label, run_start = label, at
+
+    if run_label is not None and until is not None:
+        intervals.append((run_label, run_start, max(0, until - run_start) / 1000))
+    return intervals
+
+@interview.route('/save-posture/batch', methods=['POST'])
+@require_auth
+def save_posture_batch():
+    """Save buffered posture changes as intervals of the same label"""
+    try:
+        data = request.get_json()
+
+        if not data:
+            return jsonify({'error': 'Invalid request data'}), 400
+
+        interview_id = data.get('interview_id')
+        events = data.get('events')
+        sent_at = data.get('sent_at')
+
+        if not interview_id or not isinstance(events, list):
+            return jsonify({'error': 'Interview ID and events required'}), 400
+
+        if len(events) > POSTURE_BATCH_MAX_EVENTS:
+            return jsonify({'error': f'At most {POSTURE_BATCH_MAX_EVENTS} events per batch'}), 400
+
+        parsed = []
+        for event in events:
+            label = event.get('posture_label') if isinstance(event, dict) else None
+            at = event.get('timestamp') if isinstance(event, dict) else None
+            if not isinstance(label, str) or not label.strip() or not isinstance(at, (int, float)):
+                return jsonify({'error': 'Each event needs a posture_label and a timestamp'}), 400
+            parsed.append((label.strip(), at))
+
+        # Client timestamps (ms) are shifted onto the server clock using sent_at
+        now_ms = datetime.now(timezone.utc).timestamp() * 1000
+        if not isinstance(sent_at, (int, float)):
+            sent_at = now_ms
+        offset = now_ms - sent_at
+
+        # The final batch closes the open run at the time it was sent
+        until = sent_at if data.get('final') else None
+
+        intervals = coalesce_posture_events(parsed, until)
+        for label, start, duration in intervals:
+            started_at = datetime.fromtimestamp((start + offset) / 1000, timezone.utc)
+            telemetry_writer.add_posture(interview_id, label, started_at.strftime('%Y-%m-%d %H:%M:%S'), duration)
+
+        return jsonify({
+            'success': True,
+            'intervals': len(intervals)
+        }), 200
+
+    except Exception as e:
+        print(f"Save posture batch error: {str(e)}")
+        return jsonify({'error': 'Failed to save posture'}), 500
+
 @interview.route('/end', methods=['POST'])
 @require_auth
 def end_interview():
@@ -240,6 +505,9 @@ def end_interview():
         if not interview_id:
             return jsonify({'error': 'Interview ID required'}), 400
 
+        # Buffered telemetry must be in the database before aggregating
+        telemetry_writer.flush()
+
         conn = get_db_connection()
         cursor = conn.cursor()
 
@@ -251,29 +519,9 @@ def end_interview():
             conn.close()
             return jsonify({'error': 'Interview not found'}), 404
 
-        # Calculate overall emotion (most frequent)
-        cursor.execute('''
-            SELECT emotion_label, COUNT(*) as count
-            FROM emotion_timeline
-            WHERE interview_id = ?
-            GROUP BY emotion_label
-            ORDER BY count DESC
-            LIMIT 1
-        ''', (interview_id,))
-        emotion_result = cursor.fetchone()
-        overall_emotion = emotion_result['emotion_label'] if emotion_result else 'neutral'
-
-        # Calculate overall posture (most frequent)
-        cursor.execute('''
-            SELECT posture_label, COUNT(*) as count
-            FROM posture_events
-            WHERE interview_id = ?
-            GROUP BY posture_label
-            ORDER BY count DESC
-            LIMIT 1
-        ''', (interview_id,))
-        posture_result = cursor.fetchone()
-        overall_posture = posture_result['posture_label'] if posture_result else 'Good'
+        # Overall emotion and posture (most frequent) from the running counters
+        overall_emotion = get_dominant_label(cursor, interview_id, 'emotion') or 'neutral'
+        overall_posture = get_dominant_label(cursor, interview_id, 'posture') or 'Good'
 
         # Calculate duration
         started_at = datetime.fromisoformat(interview['started_at'])
@@ -288,8 +536,41 @@ def end_interview():
         ''', ('completed', ended_at.isoformat(), overall_emotion, overall_posture, interview_id))
 
         conn.commit()
+
+        # The finished timeline moves from one row per frame to a packed blob
+        try:
+            pack_interview_timeline(cursor, interview_id)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"Pack timeline error: {str(e)}")
+
+        # Nothing about a completed interview changes, so its review is built once now
+        try:
+            cursor.execute('''
+                SELECT id, job_role, started_at, ended_at, overall_emotion, overall_posture
+                FROM interviews
+                WHERE id = ?
+            ''', (interview_id,))
+            review_store.save(cursor, interview_id, {
+                'success': True,
+                'interview': build_review(cursor, cursor.fetchone(), max_points=REVIEW_TIMELINE_POINTS)
+            })
+            conn.commit()
+        except Exception as e:
+            print(f"Store review error: {str(e)}")
+
         conn.close()
 
+        # Per-interview emotion state and any pending question are no longer needed
+        release_interview(interview_id)
+        question_prefetcher.cancel(interview_id)
+        try:
+            conversation_store.forget(interview_id)
+        except Exception as e:
+            # The interview is already completed; a stale context row is harmless
+            print(f"Forget conversation context error: {str(e)}")
+
         return jsonify({
             'success': True,
             'summary': {
@@ -303,45 +584,236 @@ def end_interview():
         print(f"End interview error: {str(e)}")
         return jsonify({'error': 'Failed to end interview'}), 500
 
+def encode_history_cursor(started_at, interview_id):
+    """Opaque cursor pointing just past an interview in /history order"""
+    return base64.urlsafe_b64encode(f'{started_at}|{interview_id}'.encode()).decode()
+
+def decode_history_cursor(value):
+    """Return (started_at, interview_id) from a cursor; raises ValueError if malformed"""
+    try:
+        started_at, interview_id = base64.urlsafe_b64decode(value.encode()).decode().rsplit('|', 1)
+    except Exception:
+        raise ValueError('Invalid cursor')
+    return started_at, int(interview_id)
+
+def to_http_datetime(timestamp):
+    """Stored local ISO timestamp as an aware UTC datetime for Last-Modified"""
+    if not timestamp:
+        return None
+    return datetime.fromisoformat(timestamp).astimezone(timezone.utc).replace(microsecond=0)
+
 @interview.route('/history', methods=['GET'])
 @require_auth
 def get_history():
-    """Get user's previous interviews"""
+    """Get user's previous interviews, newest first, one page at a time"""
     try:
         user_id = session.get('user_id')
 
+        try:
+            limit = min(max(int(request.args.get('limit', HISTORY_PAGE_SIZE)), 1), HISTORY_MAX_PAGE_SIZE)
+            page_cursor = request.args.get('cursor')
+            after = decode_history_cursor(page_cursor) if page_cursor else None
+        except ValueError:
+            return jsonify({'error': 'Invalid pagination parameters'}), 400
+
         conn = get_db_connection()
         cursor = conn.cursor()
 
+        # Validators come from a covering index; unchanged histories stop here
         cursor.execute('''
-            SELECT id, job_role, started_at, ended_at, overall_emotion, overall_posture
+            SELECT COUNT(*) AS total, MAX(id) AS latest_id, MAX(ended_at) AS latest_end
             FROM interviews
             WHERE user_id = ? AND status = 'completed'
-            ORDER BY started_at DESC
         ''', (user_id,))
+        validators = cursor.fetchone()
 
-        interviews = []
-        for row in cursor.fetchall():
-            interviews.append({
-                'id': row['id'],
-                'job_role': row['job_role'],
-                'started_at': row['started_at'],
-                'ended_at': row['ended_at'],
-                'overall_emotion': row['overall_emotion'],
-                'overall_posture': row['overall_posture']
-            })
+        etag = hashlib.sha1(
+            f"{user_id}:{validators['total']}:{validators['latest_id']}:{validators['latest_end']}:{page_cursor}:{limit}".encode()
+        ).hexdigest()
+        last_modified = to_http_datetime(validators['latest_end'])
 
-        conn.close()
+        not_modified = request.if_none_match.contains(etag)
+        if not request.if_none_match and request.if_modified_since and last_modified:
+            not_modified = last_modified <= request.if_modified_since
 
-        return jsonify({
-            'success': True,
-            'interviews': interviews
-        }), 200
+        if not_modified:
+            conn.close()
+            response = Response(status=304)
+        else:
+            if after is None:
+                # Newest first page: every row qualifies
+                cursor.execute('''
+                    SELECT id, job_role, started_at, ended_at, overall_emotion, overall_posture
+                    FROM interviews
+                    WHERE user_id = ? AND status = 'completed'
+                    ORDER BY started_at DESC, id DESC
+                    LIMIT ?
+                ''', (user_id, limit + 1))
+            else:
+                started_at, last_id = after
+                cursor.execute('''
+                    SELECT id, job_role, started_at, ended_at, overall_emotion, overall_posture
+                    FROM interviews
+                    WHERE user_id = ? AND status = 'completed' AND (started_at, id) < (?, ?)
+                    ORDER BY started_at DESC, id DESC
+                    LIMIT ?
+                ''', (user_id, started_at, last_id, limit + 1))
+            rows = cursor.fetchall()
+
+            # One extra row tells whether another page exists
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_history_cursor(rows[-1]['started_at'], rows[-1]['id'])
+
+            interviews = [dict(row) for row in rows]
+
+            payload = {
+                'success': True,
+                'interviews': interviews,
+                'total': validators['total'],
+                'next_cursor': next_cursor
+            }
+
+            # The first page also summarizes the whole history
+            if after is None:
+                cursor.execute('''
+                    SELECT overall_emotion
+                    FROM interviews
+                    WHERE user_id = ? AND status = 'completed'
+                    GROUP BY overall_emotion
+                    ORDER BY COUNT(*) DESC
+                    LIMIT 1
+                ''', (user_id,))
+                top_emotion = cursor.fetchone()
+                payload['most_common_emotion'] = top_emotion['overall_emotion'] if top_emotion else None
+
+            conn.close()
+            response = jsonify(payload)
+
+        # Browsers revalidate on every load and get a 304 while nothing changed
+        response.set_etag(etag)
+        if last_modified:
+            response.last_modified = last_modified
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
 
     except Exception as e:
         print(f"Get history error: {str(e)}")
         return jsonify({'error': 'Failed to retrieve interview history'}), 500
 
+def build_review(cursor, interview, resolution=None, max_points=TIMELINE_MAX_POINTS):
+    """Assemble the review data of an interview from the database"""
+    interview_id = interview['id']
+
+    # Get Q&A pairs
+    cursor.execute('''
+        SELECT q.question_text, q.asked_at, a.answer_text
+        FROM interview_questions q
+        LEFT JOIN interview_answers a ON q.id = a.question_id
+        WHERE q.interview_id = ? AND q.asked_at IS NOT NULL
+        ORDER BY q.question_number
+    ''', (interview_id,))
+
+    qa_pairs = []
+    for row in cursor.fetchall():
+        qa_pairs.append({
+            'question': row['question_text'],
+            'answer': row['answer_text'] if row['answer_text'] else 'No response',
+            'asked_at': row['asked_at']
+        })
+
+    # Get emotion timeline, aggregated into time buckets when it is too long.
+    # Completed interviews have it packed and are decoded with NumPy.
+    packed = load_packed_timeline(cursor, interview_id)
+    if packed is not None:
+        # Frames that landed after /end packed the timeline are merged into the blob
+        cursor.execute('SELECT 1 FROM emotion_timeline WHERE interview_id = ? LIMIT 1', (interview_id,))
+        if cursor.fetchone():
+            pack_interview_timeline(cursor, interview_id)
+            packed = load_packed_timeline(cursor, interview_id)
+        span, samples = packed.span, packed.samples
+    else:
+        first_seen, span, samples = get_timeline_span(cursor, interview_id)
+
+    if packed is None and not samples:
+        # Old interviews keep only per-minute summaries once retention has run
+        emotion_timeline = []
+        for row in get_minute_timeline(cursor, interview_id):
+            emotion_timeline.append({
+                'emotion': row['emotion_label'],
+                'confidence': round(row['confidence'], 1),
+                'timestamp': row['timestamp'],
+                'samples': row['samples']
+            })
+        if emotion_timeline:
+            resolution = 60
+    elif resolution is None and samples <= max_points and packed is not None:
+        emotion_timeline = packed.points()
+    elif resolution is None and samples <= max_points:
+        cursor.execute('''
+            SELECT emotion_label, confidence, timestamp
+            FROM emotion_timeline
+            WHERE interview_id = ?
+            ORDER BY timestamp
+        ''', (interview_id,))
+
+        emotion_timeline = []
+        for row in cursor.fetchall():
+            emotion_timeline.append({
+                'emotion': row['emotion_label'],
+                'confidence': row['confidence'],
+                'timestamp': row['timestamp']
+            })
+    else:
+        # Never finer than the point budget allows, whatever resolution was asked for
+        resolution = max(resolution or 0, math.ceil((span + 1) / max_points))
+
+        if packed is not None:
+            emotion_timeline = packed.buckets(resolution)
+        else:
+            emotion_timeline = []
+            for row in get_bucketed_timeline(cursor, interview_id, first_seen, resolution):
+                emotion_timeline.append({
+                    'emotion': row['emotion_label'],
+                    'confidence': round(row['confidence'], 1),
+                    'timestamp': row['timestamp'],
+                    'samples': row['samples']
+                })
+
+    # Get posture summary from the running counters
+    posture_summary = {
+        'good_count': 0, 'average_count': 0, 'poor_count': 0,
+        'good_seconds': 0, 'average_seconds': 0, 'poor_seconds': 0
+    }
+    for label, (count, _, seconds) in get_label_counts(cursor, interview_id, 'posture').items():
+        label = label.lower()
+        if label in ('good', 'average', 'poor'):
+            posture_summary[f'{label}_count'] += count
+            posture_summary[f'{label}_seconds'] += round(seconds)
+
+    # Per-emotion frame counts and mean confidence
+    emotion_summary = {}
+    for label, (count, confidence_sum, _) in get_label_counts(cursor, interview_id, 'emotion').items():
+        emotion_summary[label] = {
+            'count': count,
+            'average_confidence': round(confidence_sum / count, 1) if count else 0
+        }
+
+    return {
+        'id': interview['id'],
+        'job_role': interview['job_role'],
+        'started_at': interview['started_at'],
+        'ended_at': interview['ended_at'],
+        'overall_emotion': interview['overall_emotion'],
+        'overall_posture': interview['overall_posture'],
+        'qa_pairs': qa_pairs,
+        'emotion_timeline': emotion_timeline,
+        'timeline_resolution': resolution,
+        'emotion_summary': emotion_summary,
+        'posture_summary': posture_summary
+    }
+
 @interview.route('/details/<int:interview_id>', methods=['GET'])
 @require_auth
 def get_interview_details(interview_id):
@@ -349,12 +821,21 @@ def get_interview_details(interview_id):
     try:
         user_id = session.get('user_id')
 
+        # Optional timeline downsampling: bucket width in seconds, or a point budget
+        try:
+            resolution = float(request.args['resolution']) if 'resolution' in request.args else None
+            max_points = min(int(request.args.get('max_points', TIMELINE_MAX_POINTS)), TIMELINE_MAX_POINTS)
+        except ValueError:
+            return jsonify({'error': 'Invalid timeline parameters'}), 400
+        if (resolution is not None and (not math.isfinite(resolution) or resolution <= 0)) or max_points < 1:
+            return jsonify({'error': 'Invalid timeline parameters'}), 400
+
         conn = get_db_connection()
         cursor = conn.cursor()
 
         # Get interview basic info and verify ownership
         cursor.execute('''
-            SELECT id, job_role, started_at, ended_at, overall_emotion, overall_posture, user_id
+            SELECT id, job_role, started_at, ended_at, overall_emotion, overall_posture, user_id, status
             FROM interviews
             WHERE id = ?
         ''', (interview_id,))
@@ -368,72 +849,31 @@ def get_interview_details(interview_id):
             conn.close()
             return jsonify({'error': 'Access denied'}), 403
 
-        # Get Q&A pairs
-        cursor.execute('''
-            SELECT q.question_text, q.asked_at, a.answer_text
-            FROM interview_questions q
-            LEFT JOIN interview_answers a ON q.id = a.question_id
-            WHERE q.interview_id = ?
-            ORDER BY q.question_number
-        ''', (interview_id,))
-
-        qa_pairs = []
-        for row in cursor.fetchall():
-            qa_pairs.append({
-                'question': row['question_text'],
-                'answer': row['answer_text'] if row['answer_text'] else 'No response',
-                'asked_at': row['asked_at']
-            })
-
-        # Get emotion timeline
-        cursor.execute('''
-            SELECT emotion_label, confidence, timestamp
-            FROM emotion_timeline
-            WHERE interview_id = ?
-            ORDER BY timestamp
-        ''', (interview_id,))
-
-        emotion_timeline = []
-        for row in cursor.fetchall():
-            emotion_timeline.append({
-                'emotion': row['emotion_label'],
-                'confidence': row['confidence'],
-                'timestamp': row['timestamp']
-            })
-
-        # Get posture summary
-        cursor.execute('''
-            SELECT posture_label, COUNT(*) as count
-            FROM posture_events
-            WHERE interview_id = ?
-            GROUP BY posture_label
-        ''', (interview_id,))
-
-        posture_summary = {'good_count': 0, 'average_count': 0, 'poor_count': 0}
-        for row in cursor.fetchall():
-            label = row['posture_label'].lower()
-            if label == 'good':
-                posture_summary['good_count'] = row['count']
-            elif label == 'average':
-                posture_summary['average_count'] = row['count']
-            elif label == 'poor':
-                posture_summary['poor_count'] = row['count']
-
+        # Completed interviews are served from the payload stored at /end, whose
+        # REVIEW_TIMELINE_POINTS points fit any budget at least that large
+        use_stored = (
+            interview['status'] == 'completed' and resolution is None
+            and max_points >= REVIEW_TIMELINE_POINTS
+        )
+        if use_stored:
+            body = review_store.get(cursor, interview_id)
+            if body is not None:
+                conn.close()
+                return Response(body, mimetype='application/json'), 200
+            max_points = REVIEW_TIMELINE_POINTS
+
+        review = build_review(cursor, interview, resolution, max_points)
+
+        # Interviews completed before reviews were stored get theirs on first view
+        if use_stored:
+            review_store.save(cursor, interview_id, {'success': True, 'interview': review})
+        # Keeps late frames build_review merged into the packed timeline
+        conn.commit()
         conn.close()
 
         return jsonify({
             'success': True,
-            'interview': {
-                'id': interview['id'],
-                'job_role': interview['job_role'],
-                'started_at': interview['started_at'],
-                'ended_at': interview['ended_at'],
-                'overall_emotion': interview['overall_emotion'],
-                'overall_posture': interview['overall_posture'],
-                'qa_pairs': qa_pairs,
-                'emotion_timeline': emotion_timeline,
-                'posture_summary': posture_summary
-            }
+            'interview': review
         }), 200
 
     except Exception as e:
@@ -0,0 +1,364 @@
+from requests.adapters import HTTPAdapter
+import threading
+import asyncio
+import requests
+import json
+import time
+import os
+
+# Configuration
+OLLAMA_API_URL = os.getenv('OLLAMA_API_URL', 'http://localhost:11434/api/generate')
+OLLAMA_TIMEOUT = float(os.getenv('OLLAMA_TIMEOUT', 30))
+# Generations Ollama runs at once (OLLAMA_NUM_PARALLEL on the server)
+OLLAMA_MAX_PARALLEL = int(os.getenv('OLLAMA_MAX_PARALLEL', 1))
+OLLAMA_QUEUE_TIMEOUT = float(os.getenv('OLLAMA_QUEUE_TIMEOUT', 10))
+OLLAMA_BREAKER_FAILURES = int(os.getenv('OLLAMA_BREAKER_FAILURES', 3))
+OLLAMA_BREAKER_RESET = float(os.getenv('OLLAMA_BREAKER_RESET', 30))
+
+# Outcome of a call its caller abandoned (client disconnect, cancelled task):
+# the slot is freed without counting for or against Ollama's health
+CANCELLED = object()
+
+class LLMUnavailable(Exception):
+    """Ollama is known to be down or too busy; callers should use a fallback"""
+
+class CircuitOpenError(LLMUnavailable):
+    """Raised without contacting Ollama while the circuit breaker is open"""
+
+class QueueTimeoutError(LLMUnavailable):
+    """Raised when no generation slot frees up within the queue timeout"""
+
+class LLMBusy(LLMUnavailable):
+    """Raised for background requests when no slot is free right away"""
+
+def to_requests_error(error):
+    """Map an httpx error to the requests exception callers already handle"""
+    import httpx
+    if isinstance(error, httpx.TimeoutException):
+        return requests.exceptions.Timeout(str(error))
+    if isinstance(error, httpx.TransportError):
+        return requests.exceptions.ConnectionError(str(error))
+    if isinstance(error, httpx.HTTPStatusError):
+        return requests.exceptions.HTTPError(str(error), response=error.response)
+    return error
+
+def is_health_failure(error):
+    """True for errors that mean the server is unreachable or failing, not a bad request"""
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500
+    return False
+
+class ChunkStream:
+    """JSON chunks of a streaming response; frees the generation slot when done.
+
+    The slot is released once iteration finishes, fails or is closed, or when
+    the stream is garbage collected without ever being read.
+    """
+
+    def __init__(self, response, on_done):
+        self.response = response
+        self._on_done = on_done
+        self._closed = False
+
+    def __iter__(self):
+        error = None
+        try:
+            for line in self.response.iter_lines():
+                if line:
+                    yield json.loads(line)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.close(error)
+
+    def close(self, error=None):
+        """Close the response and free its slot"""
+        if self._closed:
+            return
+        self._closed = True
+        self.response.close()
+        self._on_done(error)
+
+    def __del__(self):
+        self.close()
+
+class AsyncChunkStream(ChunkStream):
+    """Async counterpart of ChunkStream for httpx streaming responses"""
+
+    def __iter__(self):
+        raise TypeError('use async for')
+
+    async def __aiter__(self):
+        error = CANCELLED
+        try:
+            async for line in self.response.aiter_lines():
+                if line:
+                    yield json.loads(line)
+            error = None
+        except Exception as e:
+            error = to_requests_error(e)
+            if error is e:
+                raise
+            raise error from e
+        finally:
+            await self.aclose(error)
+
+    async def aclose(self, error=None):
+        """Close the response and free its slot"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            await self.response.aclose()
+        finally:
+            self._on_done(error)
+
+    def close(self, error=None):
+        # Only reached when the stream is garbage collected unread
+        if self._closed:
+            return
+        self._closed = True
+        self._on_done(error)
+
+class LLMClient:
+    """Pooled HTTP client for Ollama with a concurrency limit and a circuit breaker.
+
+    At most max_parallel generations are in flight; callers wait up to
+    queue_timeout for a slot. After failure_threshold consecutive connection
+    errors, timeouts or 5xx responses the circuit opens and calls fail fast
+    for reset_timeout seconds, then a single probe decides whether it closes.
+    """
+
+    def __init__(self, url, max_parallel=1, queue_timeout=10, failure_threshold=3, reset_timeout=30):
+        self.url = url
+        self.queue_timeout = queue_timeout
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+
+        # Keep-alive connections, at least one per generation slot
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, max_parallel) + 2)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._slots = threading.BoundedSemaphore(max(1, max_parallel))
+        self._max_parallel = max(1, max_parallel)
+        self._async_client = None
+        # Reentrant, since an abandoned stream may release its slot from a garbage collection
+        self._lock = threading.RLock()
+
+        self._state = 'closed'
+        self._failures = 0
+        self._opened_at = 0
+        self._probing = False
+
+        self.requests = 0
+        self.failures = 0
+        self.short_circuited = 0
+        self.queue_timeouts = 0
+        self.background_skipped = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    def generate(self, body, timeout=OLLAMA_TIMEOUT, background=False):
+        """POST a non-streaming request and return the decoded JSON response.
+
+        Background requests never queue: they raise LLMBusy unless a slot is
+        free and no other request is waiting, so live requests go first.
+        """
+        self._acquire(background)
+        try:
+            response = self.session.post(self.url, json=body, timeout=timeout)
+            response.raise_for_status()
+            result = response.json()
+        except Exception as e:
+            self._release(e)
+            raise
+        self._release(None)
+        return result
+
+    def stream(self, body, timeout=OLLAMA_TIMEOUT):
+        """POST a streaming request and return an iterator over its JSON chunks.
+
+        The request is sent before returning, so connection errors raise here.
+        The generation slot is held until the iterator is exhausted or closed.
+        """
+        self._acquire()
+        try:
+            response = self.session.post(self.url, json=body, timeout=timeout, stream=True)
+            response.raise_for_status()
+        except Exception as e:
+            self._release(e)
+            raise
+        return ChunkStream(response, self._release)
+
+    # Async variants for the ASGI app (see asgi.py). They share the slots and
+    # the breaker with the blocking calls, since both reach the same server.
+
+    async def agenerate(self, body, timeout=OLLAMA_TIMEOUT):
+        """Async generate(); httpx errors are raised as their requests equivalents"""
+        await self._aacquire()
+        outcome = CANCELLED
+        try:
+            response = await self._async_session().post(self.url, json=body, timeout=timeout)
+            response.raise_for_status()
+            result = response.json()
+            outcome = None
+        except Exception as e:
+            outcome = to_requests_error(e)
+            if outcome is e:
+                raise
+            raise outcome from e
+        finally:
+            # Also runs on CancelledError, which is not an Exception
+            self._release(outcome)
+        return result
+
+    async def astream(self, body, timeout=OLLAMA_TIMEOUT):
+        """Async stream(); returns an async iterator over JSON chunks"""
+        await self._aacquire()
+        session = self._async_session()
+        outcome = CANCELLED
+        try:
+            response = await session.send(session.build_request('POST', self.url, json=body, timeout=timeout), stream=True)
+            response.raise_for_status()
+            outcome = None
+        except Exception as e:
+            outcome = to_requests_error(e)
+            if outcome is e:
+                raise
+            raise outcome from e
+        finally:
+            # On success the slot passes to the stream
+            if outcome is not None:
+                self._release(outcome)
+        return AsyncChunkStream(response, self._release)
+
+    def _async_session(self):
+        # Created on first use so the blocking server doesn't need httpx installed
+        if self._async_client is None:
+            import httpx
+            self._async_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self._max_parallel + 2, max_keepalive_connections=self._max_parallel + 2)
+            )
+        return self._async_client
+
+    def _acquire(self, background=False):
+        """Check the breaker, then wait for a generation slot"""
+        self._enter_queue(background)
+
+        started = time.monotonic()
+        if background:
+            acquired = self._slots.acquire(blocking=False)
+        else:
+            acquired = self._slots.acquire(timeout=self.queue_timeout)
+        self._leave_queue(acquired, time.monotonic() - started, background)
+
+    async def _aacquire(self):
+        """Async _acquire: polls for a slot instead of holding an executor thread"""
+        self._enter_queue()
+
+        started = time.monotonic()
+        delay = 0.005
+        try:
+            acquired = self._slots.acquire(blocking=False)
+            while not acquired and time.monotonic() - started < self.queue_timeout:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.1)
+                acquired = self._slots.acquire(blocking=False)
+        except BaseException:
+            # Cancelled while queued
+            with self._lock:
+                self.waiting -= 1
+                self._probing = False
+            raise
+        self._leave_queue(acquired, time.monotonic() - started)
+
+    def _enter_queue(self, background=False):
+        """Check the breaker and count the caller as waiting"""
+        with self._lock:
+            if background and self.waiting:
+                self.background_skipped += 1
+                raise LLMBusy('AI service is busy')
+            if self._state == 'open':
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    self.short_circuited += 1
+                    raise CircuitOpenError('AI service circuit is open')
+                self._state = 'half-open'
+            if self._state == 'half-open':
+                # Only one probe request while deciding whether to close
+                if self._probing:
+                    self.short_circuited += 1
+                    raise CircuitOpenError('AI service circuit is half-open')
+                self._probing = True
+            self.waiting += 1
+
+    def _leave_queue(self, acquired, waited, background=False):
+        """Record the wait; raise if no slot was obtained"""
+        with self._lock:
+            self.waiting -= 1
+            if background and not acquired:
+                self.background_skipped += 1
+                self._probing = False
+                raise LLMBusy('AI service is busy')
+            self.queue_wait_total += waited
+            self.queue_wait_max = max(self.queue_wait_max, waited)
+            if not acquired:
+                self.queue_timeouts += 1
+                self._probing = False
+                raise QueueTimeoutError('Timed out waiting for the AI service')
+            self.requests += 1
+            self.in_flight += 1
+
+    def _release(self, error):
+        """Free the slot and update the breaker with the outcome"""
+        self._slots.release()
+        with self._lock:
+            self.in_flight -= 1
+            self._probing = False
+
+            if error is CANCELLED:
+                return
+            if error is not None and is_health_failure(error):
+                self.failures += 1
+                self._failures += 1
+                if self._state == 'half-open' or self._failures >= self.failure_threshold:
+                    if self._state != 'open':
+                        print(f"AI service circuit opened after {self._failures} failures")
+                    self._state = 'open'
+                    self._opened_at = time.monotonic()
+            else:
+                self._failures = 0
+                self._state = 'closed'
+
+    def stats(self):
+        """Return breaker state and queue counters"""
+        with self._lock:
+            waits = self.requests + self.queue_timeouts
+            return {
+                'state': self._state,
+                'max_parallel': self._max_parallel,
+                'in_flight': self.in_flight,
+                'waiting': self.waiting,
+                'requests': self.requests,
+                'failures': self.failures,
+                'consecutive_failures': self._failures,
+                'short_circuited': self.short_circuited,
+                'queue_timeouts': self.queue_timeouts,
+                'background_skipped': self.background_skipped,
+                'avg_queue_wait_ms': round(1000 * self.queue_wait_total / waits, 1) if waits else 0,
+                'max_queue_wait_ms': round(1000 * self.queue_wait_max, 1)
+            }
+
+ollama_client = LLMClient(
+    OLLAMA_API_URL,
+    max_parallel=OLLAMA_MAX_PARALLEL,
+    queue_timeout=OLLAMA_QUEUE_TIMEOUT,
+    failure_threshold=OLLAMA_BREAKER_FAILURES,
+    reset_timeout=OLLAMA_BREAKER_RESET
+)
@@ -0,0 +1,190 @@
+from database import get_db_connection, DATABASE_PATH
+from timeline_store import decode_rows
+from datetime import datetime, timedelta
+import argparse
+import time
+import os
+
+# Retention for raw telemetry of completed interviews:
+#   python maintenance.py [--days 30] [--dry-run] [--enable-incremental-vacuum]
+# Emotion samples and posture rows of interviews that ended more than --days ago
+# are rolled into per-minute summaries (telemetry_minutes) and deleted in small
+# transactions, then the freed pages are returned to the filesystem with
+# incremental vacuum. Safe to run while the app is serving and to re-run.
+
+# Configuration
+TELEMETRY_RETENTION_DAYS = float(os.getenv('TELEMETRY_RETENTION_DAYS', 30))
+MAINTENANCE_CHUNK_ROWS = int(os.getenv('MAINTENANCE_CHUNK_ROWS', 500))
+MAINTENANCE_PAUSE_MS = int(os.getenv('MAINTENANCE_PAUSE_MS', 50))
+MAINTENANCE_VACUUM_PAGES = int(os.getenv('MAINTENANCE_VACUUM_PAGES', 1000))
+
+MINUTE_UPSERT = '''
+    INSERT INTO telemetry_minutes (interview_id, kind, minute, label, count, confidence_sum, duration_sum)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (interview_id, kind, minute, label) DO UPDATE SET
+        count = count + excluded.count,
+        confidence_sum = confidence_sum + excluded.confidence_sum,
+        duration_sum = duration_sum + excluded.duration_sum
+'''
+
+def database_bytes():
+    """Size on disk of the database file and its WAL"""
+    total = 0
+    for suffix in ('', '-wal'):
+        if os.path.exists(DATABASE_PATH + suffix):
+            total += os.path.getsize(DATABASE_PATH + suffix)
+    return total
+
+def summarize_minutes(interview_id, kind, rows):
+    """Collapse (label, confidence, timestamp, duration) rows into telemetry_minutes upserts"""
+    totals = {}
+    for label, confidence, timestamp, duration in rows:
+        key = (timestamp[:16] + ':00', label)
+        count, confidence_sum, duration_sum = totals.get(key, (0, 0, 0))
+        totals[key] = (count + 1, confidence_sum + (confidence or 0), duration_sum + (duration or 0))
+    return [
+        (interview_id, kind, minute, label, count, confidence_sum, duration_sum)
+        for (minute, label), (count, confidence_sum, duration_sum) in totals.items()
+    ]
+
+def expired_interviews(cursor, cutoff):
+    """Completed interviews that ended before cutoff and still have raw telemetry"""
+    cursor.execute('''
+        SELECT id FROM interviews i
+        WHERE status = 'completed' AND ended_at < ?
+          AND (EXISTS (SELECT 1 FROM emotion_timeline_packed WHERE interview_id = i.id)
+               OR EXISTS (SELECT 1 FROM emotion_timeline WHERE interview_id = i.id)
+               OR EXISTS (SELECT 1 FROM posture_events WHERE interview_id = i.id))
+        ORDER BY id
+    ''', (cutoff,))
+    return [row['id'] for row in cursor.fetchall()]
+
+def compact_packed(conn, interview_id):
+    """Summarize and drop an interview's packed emotion timeline, in one transaction"""
+    cursor = conn.cursor()
+    cursor.execute('SELECT data FROM emotion_timeline_packed WHERE interview_id = ?', (interview_id,))
+    row = cursor.fetchone()
+    if not row:
+        return 0
+
+    rows = decode_rows(row['data'])
+    cursor.executemany(MINUTE_UPSERT, summarize_minutes(interview_id, 'emotion', [sample + (0,) for sample in rows]))
+    cursor.execute('DELETE FROM emotion_timeline_packed WHERE interview_id = ?', (interview_id,))
+    conn.commit()
+    return len(rows)
+
+def compact_rows(conn, interview_id, table, kind, columns, chunk_rows, pause):
+    """Summarize and delete an interview's raw rows, chunk_rows per transaction.
+
+    Each chunk's summary and delete commit together, so an interrupted run
+    never counts a row twice.
+    """
+    cursor = conn.cursor()
+    total = 0
+    while True:
+        cursor.execute(
+            f'SELECT id, {columns} FROM {table} WHERE interview_id = ? ORDER BY id LIMIT ?',
+            (interview_id, chunk_rows)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            return total
+
+        cursor.executemany(MINUTE_UPSERT, summarize_minutes(interview_id, kind, [tuple(row)[1:] for row in rows]))
+        cursor.executemany(f'DELETE FROM {table} WHERE id = ?', [(row['id'],) for row in rows])
+        conn.commit()
+        total += len(rows)
+
+        # Let the app's writers in between chunks
+        time.sleep(pause)
+
+def incremental_vacuum(conn, pages, pause):
+    """Release free pages to the filesystem in steps of pages; returns pages released"""
+    auto_vacuum = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+    if auto_vacuum != 2:
+        print("Incremental vacuum is off for this database; run once with "
+              "--enable-incremental-vacuum (a full VACUUM) to enable it")
+        return 0
+
+    released = 0
+    while True:
+        free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        if not free_pages:
+            break
+        # executescript steps the pragma to completion, execute() frees one page
+        conn.executescript(f'PRAGMA incremental_vacuum({pages});')
+        released += min(free_pages, pages)
+        time.sleep(pause)
+
+    # Apply the truncation to the database file itself
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    return released
+
+def enable_incremental_vacuum(conn):
+    """Switch an existing database to incremental auto-vacuum (rewrites the whole file)"""
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    conn.executescript('VACUUM;')
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+def run_retention(days=TELEMETRY_RETENTION_DAYS, chunk_rows=MAINTENANCE_CHUNK_ROWS,
+                  pause_ms=MAINTENANCE_PAUSE_MS, vacuum_pages=MAINTENANCE_VACUUM_PAGES, dry_run=False):
+    """Compact telemetry of interviews that ended more than days ago; returns a report"""
+    # ended_at is stored as local ISO time by /end
+    cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+    pause = pause_ms / 1000
+
+    conn = get_db_connection()
+    try:
+        bytes_before = database_bytes()
+        interview_ids = expired_interviews(conn.cursor(), cutoff)
+        report = {
+            'cutoff': cutoff,
+            'interviews': len(interview_ids),
+            'emotion_samples': 0,
+            'posture_rows': 0,
+            'pages_released': 0,
+            'bytes_before': bytes_before
+        }
+
+        if not dry_run:
+            for interview_id in interview_ids:
+                report['emotion_samples'] += compact_packed(conn, interview_id)
+                report['emotion_samples'] += compact_rows(
+                    conn, interview_id, 'emotion_timeline', 'emotion',
+                    'emotion_label, confidence, timestamp, 0', chunk_rows, pause
+                )
+                report['posture_rows'] += compact_rows(
+                    conn, interview_id, 'posture_events', 'posture',
+                    'posture_label, 0, timestamp, duration', chunk_rows, pause
+                )
+            report['pages_released'] = incremental_vacuum(conn, vacuum_pages, pause)
+    finally:
+        conn.close()
+
+    report['bytes_after'] = database_bytes()
+    report['bytes_reclaimed'] = max(0, bytes_before - report['bytes_after'])
+    return report
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Roll old telemetry into per-minute summaries and reclaim space')
+    parser.add_argument('--days', type=float, default=TELEMETRY_RETENTION_DAYS, help='keep raw telemetry of interviews that ended within this many days')
+    parser.add_argument('--chunk-rows', type=int, default=MAINTENANCE_CHUNK_ROWS, help='rows deleted per transaction')
+    parser.add_argument('--dry-run', action='store_true', help='only report which interviews would be compacted')
+    parser.add_argument('--enable-incremental-vacuum', action='store_true', help='convert an existing database first (full VACUUM, blocks writers)')
+    args = parser.parse_args()
+
+    if args.enable_incremental_vacuum and not args.dry_run:
+        conn = get_db_connection()
+        enable_incremental_vacuum(conn)
+        conn.close()
+
+    report = run_retention(days=args.days, chunk_rows=args.chunk_rows, dry_run=args.dry_run)
+
+    verb = 'Would compact' if args.dry_run else 'Compacted'
+    print(f"{verb} telemetry of {report['interviews']} interviews that ended before {report['cutoff']}")
+    if not args.dry_run:
+        print(f"  emotion samples summarized: {report['emotion_samples']}")
+        print(f"  posture rows summarized:    {report['posture_rows']}")
+        print(f"  pages released:             {report['pages_released']}")
+    print(f"  database size: {report['bytes_before']} -> {report['bytes_after']} bytes "
+          f"({report['bytes_reclaimed']} reclaimed)")
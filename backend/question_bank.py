@@ -0,0 +1,145 @@
+from ttl_cache import TTLCache
+from llm_client import LLMBusy
+import threading
+import random
+import time
+
+def normalize_role(job_role):
+    """Case- and whitespace-insensitive cache key for a job role"""
+    return ' '.join(job_role.lower().split())
+
+class QuestionBank:
+    """Pool of generated question variants per (job role, question slot).
+
+    Interviews draw variants they haven't been served yet, and a background
+    job keeps the pools of popular roles topped up so common interviews never
+    wait on the LLM.
+    """
+
+    def __init__(self, generate, max_questions=10, variants=3, max_entries=640,
+                 ttl_seconds=86400, warm_interval=300, warm_roles=5):
+        # generate(job_role, question_number) returns a question or raises;
+        # LLMBusy means live requests need the AI service and warming should wait
+        self.generate = generate
+        self.max_questions = max_questions
+        self.variants = max(1, variants)
+        self.warm_interval = warm_interval
+        self.warm_roles = warm_roles
+
+        self._pools = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._served = TTLCache(max_entries=4096, ttl_seconds=12 * 3600)
+        self._role_names = {}
+        self._popularity = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self.hits = 0
+        self.misses = 0
+        self.warmed = 0
+        self.warm_failures = 0
+        self.warm_skipped = 0
+
+    def draw(self, interview_id, job_role, question_number):
+        """Return a variant this interview hasn't seen yet, or None on a miss"""
+        role = normalize_role(job_role)
+        self._ensure_warming()
+
+        with self._lock:
+            self._role_names[role] = job_role
+            self._popularity[role] = self._popularity.get(role, 0) + 1
+
+            served = self._served.get(str(interview_id)) or set()
+            pool = self._pools.get((role, question_number)) or []
+            unseen = [text for text in pool if text not in served]
+
+            if not unseen:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            question_text = random.choice(unseen)
+            self._served.set(str(interview_id), served | {question_text})
+            return question_text
+
+    def add(self, job_role, question_number, question_text, served_to=None):
+        """Bank a freshly generated question, optionally marking it served to an interview"""
+        question_text = question_text.strip()
+        if not question_text:
+            return
+
+        key = (normalize_role(job_role), question_number)
+        with self._lock:
+            pool = self._pools.get(key) or []
+            if question_text not in pool:
+                # Keep the newest variants once the pool is full
+                self._pools.set(key, (pool + [question_text])[-self.variants:])
+
+            if served_to is not None:
+                served = self._served.get(str(served_to)) or set()
+                self._served.set(str(served_to), served | {question_text})
+
+    def forget(self, interview_id):
+        """Drop the served-question record of an interview that has ended"""
+        self._served.pop(str(interview_id))
+
+    def refill(self, job_role):
+        """Generate variants until every slot of a role has a full pool"""
+        role = normalize_role(job_role)
+        for question_number in range(1, self.max_questions + 1):
+            # Bounded, since the model may repeat a variant it already gave
+            for _ in range(self.variants * 2):
+                if len(self._pools.get((role, question_number)) or []) >= self.variants:
+                    break
+                self.add(job_role, question_number, self.generate(job_role, question_number))
+                with self._lock:
+                    self.warmed += 1
+
+    def _ensure_warming(self):
+        if self._thread is None and self.warm_interval > 0:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._warm_loop, name='question-bank-warmer', daemon=True)
+                    self._thread.start()
+
+    def _warm_loop(self):
+        while True:
+            time.sleep(self.warm_interval)
+
+            with self._lock:
+                popular = sorted(self._popularity, key=self._popularity.get, reverse=True)[:self.warm_roles]
+                roles = [self._role_names[role] for role in popular]
+                # Decay so roles that stop being used drop out of the warm set
+                self._popularity = {
+                    role: count // 2 for role, count in self._popularity.items() if count // 2 > 0
+                }
+                self._role_names = {role: self._role_names[role] for role in self._popularity}
+
+            for job_role in roles:
+                try:
+                    self.refill(job_role)
+                except LLMBusy:
+                    # Live requests are using the AI service - skip this round
+                    with self._lock:
+                        self.warm_skipped += 1
+                    break
+                except Exception as e:
+                    # AI service is down or slow - try again next round
+                    print(f"Question bank warm error: {str(e)}")
+                    with self._lock:
+                        self.warm_failures += 1
+                    break
+
+    def stats(self):
+        """Return hit/miss and warming counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'pools': len(self._pools),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0,
+                'warmed': self.warmed,
+                'warm_failures': self.warm_failures,
+                'warm_skipped': self.warm_skipped,
+                'popular_roles': sorted(self._popularity, key=self._popularity.get, reverse=True)[:self.warm_roles]
+            }
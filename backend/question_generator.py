@@ -0,0 +1,479 @@
+from concurrent.futures import ThreadPoolExecutor, CancelledError, TimeoutError as FutureTimeoutError
+import asyncio
+from question_bank import QuestionBank
+from conversation_store import ConversationStore
+from llm_client import ollama_client, LLMUnavailable, OLLAMA_TIMEOUT, OLLAMA_QUEUE_TIMEOUT
+import threading
+import requests
+import json
+import re
+import os
+
+# Configuration
+OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'llama2')
+MAX_QUESTIONS = int(os.getenv('MAX_QUESTIONS', 10))
+# 'incremental' generates each question when it is asked, 'plan' generates
+# the whole interview in one call at /start
+QUESTION_MODE = os.getenv('QUESTION_MODE', 'incremental')
+OLLAMA_PLAN_TIMEOUT = float(os.getenv('OLLAMA_PLAN_TIMEOUT', 90))
+MAX_QUESTION_LENGTH = 400
+QUESTION_PREFETCH = os.getenv('QUESTION_PREFETCH', 'true').lower() == 'true'
+QUESTION_PREFETCH_WORKERS = int(os.getenv('QUESTION_PREFETCH_WORKERS', 2))
+QUESTION_BANK = os.getenv('QUESTION_BANK', 'true').lower() == 'true'
+QUESTION_BANK_VARIANTS = int(os.getenv('QUESTION_BANK_VARIANTS', 3))
+QUESTION_BANK_MAX_ENTRIES = int(os.getenv('QUESTION_BANK_MAX_ENTRIES', 640))
+QUESTION_BANK_TTL = float(os.getenv('QUESTION_BANK_TTL', 86400))
+QUESTION_BANK_WARM_INTERVAL = float(os.getenv('QUESTION_BANK_WARM_INTERVAL', 300))
+QUESTION_BANK_WARM_ROLES = int(os.getenv('QUESTION_BANK_WARM_ROLES', 5))
+# Continue each interview's Ollama conversation instead of sending stateless prompts;
+# takes precedence over the question bank when both are enabled
+QUESTION_CONTEXT = os.getenv('QUESTION_CONTEXT', 'false').lower() == 'true'
+QUESTION_CONTEXT_MAX_TOKENS = int(os.getenv('QUESTION_CONTEXT_MAX_TOKENS', 4096))
+QUESTION_CONTEXT_MAX_INTERVIEWS = int(os.getenv('QUESTION_CONTEXT_MAX_INTERVIEWS', 256))
+
+# Banked questions are role-generic, so they don't mix with per-interview conversations
+USE_QUESTION_BANK = QUESTION_BANK and not QUESTION_CONTEXT
+
+def build_prompt(job_role, question_number):
+    """Prompt for a single interview question"""
+    return f"""You are an experienced interviewer conducting a job interview for the position of {job_role}.
+This is question number {question_number} of the interview.
+Generate a single relevant interview question.
+Only return the question text, nothing else."""
+
+def build_followup_prompt(job_role, question_number, previous_answer, with_context):
+    """Prompt for the next question of an interview conversation"""
+    answer = f'The candidate answered: "{previous_answer}"\n' if previous_answer else ''
+    if with_context:
+        # The role and earlier questions are already in the model's context
+        return f"""{answer}Now ask question number {question_number}. It may follow up on the answer.
+Only return the question text, nothing else."""
+    return f"""You are an experienced interviewer conducting a job interview for the position of {job_role}.
+{answer}This is question number {question_number} of the interview.
+Generate a single relevant interview question.
+Only return the question text, nothing else."""
+
+def fallback_question(job_role, question_number):
+    """Generic question used when the AI service returns something unusable"""
+    fallback_questions = [
+        f"Tell me about yourself and your experience with {job_role}.",
+        "What are your greatest strengths?",
+        "What are your biggest weaknesses?",
+        f"Why do you want to work as a {job_role}?",
+        "Describe a challenging project you've worked on.",
+        "Where do you see yourself in 5 years?",
+        "How do you handle stress and pressure?",
+        "What motivates you in your work?",
+        "Tell me about a time you worked in a team.",
+        "Do you have any questions for us?"
+    ]
+    return fallback_questions[min(question_number - 1, len(fallback_questions) - 1)]
+
+conversation_store = ConversationStore(
+    max_tokens=QUESTION_CONTEXT_MAX_TOKENS,
+    max_interviews=QUESTION_CONTEXT_MAX_INTERVIEWS
+)
+
+def build_request(job_role, question_number, stream, interview_id=None, previous_answer=None):
+    """Ollama request body, continuing the interview's conversation when one is given"""
+    if interview_id is None:
+        return {
+            'model': OLLAMA_MODEL,
+            'prompt': build_prompt(job_role, question_number),
+            'stream': stream
+        }
+
+    context = conversation_store.get(interview_id, question_number - 1)
+    body = {
+        'model': OLLAMA_MODEL,
+        'prompt': build_followup_prompt(job_role, question_number, previous_answer, context is not None),
+        'stream': stream
+    }
+    if context is not None:
+        body['context'] = context
+    return body
+
+def request_question(job_role, question_number, interview_id=None, previous_answer=None):
+    """Ask Ollama for one question; raises on any failure.
+
+    With an interview_id the interview's conversation context is continued
+    and the returned context is kept for its next question.
+    """
+    result = ollama_client.generate(
+        build_request(job_role, question_number, False, interview_id, previous_answer),
+        timeout=OLLAMA_TIMEOUT
+    )
+    return read_question(result, interview_id, question_number)
+
+def read_question(result, interview_id, question_number):
+    """Extract the question from an Ollama response, keeping the conversation context"""
+    question_text = result.get('response', '').strip()
+    if not question_text:
+        raise ValueError('Empty response from AI service')
+
+    if interview_id is not None:
+        conversation_store.save(interview_id, question_number, result.get('context'))
+    return question_text
+
+def warm_question(job_role, question_number):
+    """Generate a bank variant in the background lane; raises LLMBusy instead of queueing"""
+    result = ollama_client.generate(
+        build_request(job_role, question_number, False),
+        timeout=OLLAMA_TIMEOUT,
+        background=True
+    )
+    return read_question(result, None, question_number)
+
+question_bank = QuestionBank(
+    generate=warm_question,
+    max_questions=MAX_QUESTIONS,
+    variants=QUESTION_BANK_VARIANTS,
+    max_entries=QUESTION_BANK_MAX_ENTRIES,
+    ttl_seconds=QUESTION_BANK_TTL,
+    warm_interval=QUESTION_BANK_WARM_INTERVAL,
+    warm_roles=QUESTION_BANK_WARM_ROLES
+)
+
+def generate_question_text(interview_id, job_role, question_number, previous_answer=None):
+    """Draw a banked question for the interview, or generate one with Ollama.
+
+    Connection errors and timeouts propagate so callers can report the AI service
+    as unavailable; any other failure, or an open circuit breaker, falls back to
+    a generic question.
+    """
+    if USE_QUESTION_BANK:
+        question_text = question_bank.draw(interview_id, job_role, question_number)
+        if question_text is not None:
+            return question_text
+
+    try:
+        question_text = request_question(
+            job_role, question_number,
+            interview_id if QUESTION_CONTEXT else None, previous_answer
+        )
+
+    except LLMUnavailable:
+        return fallback_question(job_role, question_number)
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+        raise
+    except ValueError:
+        return f"Tell me about your experience relevant to {job_role}."
+    except Exception as e:
+        print(f"Ollama error: {str(e)}")
+        return fallback_question(job_role, question_number)
+
+    if USE_QUESTION_BANK:
+        question_bank.add(job_role, question_number, question_text, served_to=interview_id)
+    return question_text
+
+def build_plan_prompt(job_role, count):
+    """Prompt for a whole interview's questions in one call"""
+    return f"""You are an experienced interviewer preparing a job interview for the position of {job_role}.
+Write {count} interview questions in the order you would ask them, starting with an introduction and ending with a closing question.
+Return only a JSON array of {count} strings, nothing else."""
+
+def parse_question_plan(text, count):
+    """Extract up to count distinct questions from a JSON array or a numbered list"""
+    candidates = []
+
+    start, end = text.find('['), text.rfind(']')
+    if start != -1 and end > start:
+        try:
+            parsed = json.loads(text[start:end + 1])
+            if isinstance(parsed, list):
+                candidates = [item for item in parsed if isinstance(item, str)]
+        except ValueError:
+            pass
+
+    # Models often ignore the format and answer with a numbered list
+    if not candidates:
+        candidates = re.findall(r'^\s*\d+[.)]\s*(.+?)\s*$', text, re.MULTILINE)
+
+    questions = []
+    seen = set()
+    for candidate in candidates:
+        question_text = candidate.strip().strip('"').strip()
+        if not question_text or len(question_text) > MAX_QUESTION_LENGTH:
+            continue
+        if question_text.lower() in seen:
+            continue
+        seen.add(question_text.lower())
+        questions.append(question_text)
+
+    return questions[:count]
+
+def generate_question_plan(interview_id, job_role, count):
+    """Return {question_number: text} for an interview from a single Ollama call.
+
+    Slots the model didn't fill are taken from the question bank when possible;
+    anything still missing is generated the usual way when it is asked.
+    """
+    planned = []
+    try:
+        result = ollama_client.generate(
+            {
+                'model': OLLAMA_MODEL,
+                'prompt': build_plan_prompt(job_role, count),
+                'stream': False
+            },
+            timeout=OLLAMA_PLAN_TIMEOUT
+        )
+        planned = parse_question_plan(result.get('response', ''), count)
+    except Exception as e:
+        print(f"Ollama plan error: {str(e)}")
+
+    return fill_question_plan(interview_id, job_role, planned, count)
+
+def fill_question_plan(interview_id, job_role, planned, count):
+    """Number the planned questions and fill missing slots from the question bank"""
+    plan = {number: text for number, text in enumerate(planned, start=1)}
+
+    if USE_QUESTION_BANK:
+        for question_number in range(len(planned) + 1, count + 1):
+            question_text = question_bank.draw(interview_id, job_role, question_number)
+            if question_text is not None:
+                plan[question_number] = question_text
+
+    return plan
+
+def stream_question_text(interview_id, job_role, question_number, previous_answer=None):
+    """Start a streaming Ollama generation and return an iterator over its tokens.
+
+    The request is sent before returning, so connection errors and timeouts
+    raise here just like generate_question_text. A banked question is returned
+    as a single token.
+    """
+    if USE_QUESTION_BANK:
+        question_text = question_bank.draw(interview_id, job_role, question_number)
+        if question_text is not None:
+            return iter([question_text])
+
+    try:
+        chunks = ollama_client.stream(
+            build_request(
+                job_role, question_number, True,
+                interview_id if QUESTION_CONTEXT else None, previous_answer
+            ),
+            timeout=OLLAMA_TIMEOUT
+        )
+
+    except LLMUnavailable:
+        return iter([fallback_question(job_role, question_number)])
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+        raise
+    except Exception as e:
+        print(f"Ollama error: {str(e)}")
+        return iter([fallback_question(job_role, question_number)])
+
+    return _iter_tokens(chunks, interview_id, job_role, question_number)
+
+def _iter_tokens(chunks, interview_id, job_role, question_number):
+    """Yield response tokens from Ollama's newline-delimited JSON stream"""
+    tokens = []
+    produced = False
+    try:
+        for chunk in chunks:
+            token = chunk.get('response', '')
+            if token:
+                produced = True
+                tokens.append(token)
+                yield token
+            if chunk.get('done'):
+                finish_stream(chunk, tokens, interview_id, job_role, question_number)
+                break
+    except Exception as e:
+        print(f"Ollama stream error: {str(e)}")
+        if not produced:
+            yield fallback_question(job_role, question_number)
+    finally:
+        chunks.close()
+
+def finish_stream(chunk, tokens, interview_id, job_role, question_number):
+    """Bank or continue a completed streaming generation"""
+    # Only complete generations are banked or continued
+    if QUESTION_CONTEXT:
+        conversation_store.save(interview_id, question_number, chunk.get('context'))
+    elif QUESTION_BANK:
+        question_bank.add(job_role, question_number, ''.join(tokens), served_to=interview_id)
+
+# Async variants for the ASGI app (see asgi.py). They mirror the functions
+# above, awaiting Ollama and running database work in the default executor.
+
+async def agenerate_question_text(interview_id, job_role, question_number, previous_answer=None):
+    """Async generate_question_text"""
+    if USE_QUESTION_BANK:
+        question_text = question_bank.draw(interview_id, job_role, question_number)
+        if question_text is not None:
+            return question_text
+
+    conversation_id = interview_id if QUESTION_CONTEXT else None
+    try:
+        body = await asyncio.to_thread(build_request, job_role, question_number, False, conversation_id, previous_answer)
+        result = await ollama_client.agenerate(body, timeout=OLLAMA_TIMEOUT)
+        question_text = await asyncio.to_thread(read_question, result, conversation_id, question_number)
+
+    except LLMUnavailable:
+        return fallback_question(job_role, question_number)
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+        raise
+    except ValueError:
+        return f"Tell me about your experience relevant to {job_role}."
+    except Exception as e:
+        print(f"Ollama error: {str(e)}")
+        return fallback_question(job_role, question_number)
+
+    if USE_QUESTION_BANK:
+        question_bank.add(job_role, question_number, question_text, served_to=interview_id)
+    return question_text
+
+async def agenerate_question_plan(interview_id, job_role, count):
+    """Async generate_question_plan"""
+    planned = []
+    try:
+        result = await ollama_client.agenerate(
+            {
+                'model': OLLAMA_MODEL,
+                'prompt': build_plan_prompt(job_role, count),
+                'stream': False
+            },
+            timeout=OLLAMA_PLAN_TIMEOUT
+        )
+        planned = parse_question_plan(result.get('response', ''), count)
+    except Exception as e:
+        print(f"Ollama plan error: {str(e)}")
+
+    return fill_question_plan(interview_id, job_role, planned, count)
+
+async def astream_question_text(interview_id, job_role, question_number, previous_answer=None):
+    """Async stream_question_text; returns an async iterator over tokens"""
+    if USE_QUESTION_BANK:
+        question_text = question_bank.draw(interview_id, job_role, question_number)
+        if question_text is not None:
+            return _aiter_text(question_text)
+
+    conversation_id = interview_id if QUESTION_CONTEXT else None
+    try:
+        body = await asyncio.to_thread(build_request, job_role, question_number, True, conversation_id, previous_answer)
+        chunks = await ollama_client.astream(body, timeout=OLLAMA_TIMEOUT)
+
+    except LLMUnavailable:
+        return _aiter_text(fallback_question(job_role, question_number))
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+        raise
+    except Exception as e:
+        print(f"Ollama error: {str(e)}")
+        return _aiter_text(fallback_question(job_role, question_number))
+
+    return _aiter_tokens(chunks, interview_id, job_role, question_number)
+
+async def _aiter_text(question_text):
+    yield question_text
+
+async def _aiter_tokens(chunks, interview_id, job_role, question_number):
+    """Async _iter_tokens"""
+    tokens = []
+    produced = False
+    try:
+        async for chunk in chunks:
+            token = chunk.get('response', '')
+            if token:
+                produced = True
+                tokens.append(token)
+                yield token
+            if chunk.get('done'):
+                await asyncio.to_thread(finish_stream, chunk, tokens, interview_id, job_role, question_number)
+                break
+    except Exception as e:
+        print(f"Ollama stream error: {str(e)}")
+        if not produced:
+            yield fallback_question(job_role, question_number)
+    finally:
+        await chunks.aclose()
+
+class QuestionPrefetcher:
+    """Generate the next question of each interview in the background"""
+
+    def __init__(self, generate, max_workers=2):
+        self.generate = generate
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='question-prefetch')
+        # generate(interview_id, job_role, question_number, previous_answer)
+        # interview_id -> (job_role, question_number, future); one pending question per interview
+        self._pending = {}
+        self._lock = threading.Lock()
+
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.cancelled = 0
+
+    def prefetch(self, interview_id, job_role, question_number, previous_answer=None):
+        """Start generating a question unless it is already in flight"""
+        if question_number > MAX_QUESTIONS:
+            return
+
+        key = str(interview_id)
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None and pending[:2] == (job_role, question_number):
+                return
+            if pending is not None:
+                self._cancel(pending)
+
+            future = self._executor.submit(self.generate, interview_id, job_role, question_number, previous_answer)
+            self._pending[key] = (job_role, question_number, future)
+            self.started += 1
+
+    def take(self, interview_id, job_role, question_number):
+        """Return the prefetched question, waiting for it if still generating.
+
+        Returns None when nothing matching was prefetched, or when it doesn't
+        finish in time. Generation errors are re-raised as if the caller had
+        generated the question itself.
+        """
+        key = str(interview_id)
+        with self._lock:
+            pending = self._pending.pop(key, None)
+            if pending is None or pending[:2] != (job_role, question_number):
+                if pending is not None:
+                    self._cancel(pending)
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        try:
+            return pending[2].result(timeout=OLLAMA_QUEUE_TIMEOUT + OLLAMA_TIMEOUT + 5)
+        except CancelledError:
+            return None
+        except FutureTimeoutError:
+            # The caller generates the question itself; this result is discarded
+            with self._lock:
+                self._cancel(pending)
+            return None
+
+    def cancel(self, interview_id):
+        """Drop the pending question of an interview that has ended"""
+        with self._lock:
+            pending = self._pending.pop(str(interview_id), None)
+            if pending is not None:
+                self._cancel(pending)
+
+        question_bank.forget(interview_id)
+
+    def _cancel(self, pending):
+        # A generation that already started can't be interrupted; its result is discarded
+        pending[2].cancel()
+        self.cancelled += 1
+
+    def stats(self):
+        """Return prefetch counters"""
+        with self._lock:
+            return {
+                'enabled': QUESTION_PREFETCH,
+                'pending': len(self._pending),
+                'started': self.started,
+                'hits': self.hits,
+                'misses': self.misses,
+                'cancelled': self.cancelled
+            }
+
+question_prefetcher = QuestionPrefetcher(generate_question_text, max_workers=QUESTION_PREFETCH_WORKERS)
@@ -0,0 +1,54 @@
+from ttl_cache import TTLCache
+import json
+import zlib
+import os
+
+# Configuration
+REVIEW_CACHE_ENTRIES = int(os.getenv('REVIEW_CACHE_ENTRIES', 256))
+
+class ReviewStore:
+    """Review payloads of completed interviews, built once at /end.
+
+    Payloads are kept as serialized JSON in an in-process LRU and zlib-compressed
+    in interview_reviews, so /details never rebuilds or re-serializes them.
+    """
+
+    def __init__(self, max_entries=256):
+        self._cache = TTLCache(max_entries=max_entries)
+
+    def get(self, cursor, interview_id):
+        """Return the stored JSON body of an interview's review, or None"""
+        # IDs arrive as strings from JSON bodies and as ints from URLs
+        interview_id = int(interview_id)
+        body = self._cache.get(interview_id)
+        if body is not None:
+            return body
+
+        cursor.execute('SELECT payload FROM interview_reviews WHERE interview_id = ?', (interview_id,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+
+        body = zlib.decompress(row['payload'])
+        self._cache.set(interview_id, body)
+        return body
+
+    def save(self, cursor, interview_id, payload):
+        """Serialize and store a review; committed with the caller's transaction"""
+        interview_id = int(interview_id)
+        body = json.dumps(payload, separators=(',', ':')).encode()
+        cursor.execute(
+            'INSERT OR REPLACE INTO interview_reviews (interview_id, payload) VALUES (?, ?)',
+            (interview_id, zlib.compress(body))
+        )
+        self._cache.set(interview_id, body)
+
+    def forget(self, interview_id):
+        """Drop a cached review, e.g. after its rows were changed"""
+        self._cache.pop(int(interview_id))
+
+    def stats(self):
+        """Return LRU counters"""
+        return self._cache.stats()
+
+review_store = ReviewStore(max_entries=REVIEW_CACHE_ENTRIES)
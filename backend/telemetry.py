@@ -0,0 +1,154 @@
+from database import get_db_connection
+import threading
+import atexit
+import time
+import os
+
+# Configuration
+TELEMETRY_FLUSH_ROWS = int(os.getenv('TELEMETRY_FLUSH_ROWS', 200))
+TELEMETRY_FLUSH_INTERVAL_MS = float(os.getenv('TELEMETRY_FLUSH_INTERVAL_MS', 1000))
+TELEMETRY_MAX_BUFFERED_ROWS = int(os.getenv('TELEMETRY_MAX_BUFFERED_ROWS', 50000))
+
+def utc_timestamp():
+    """Current time in the same format as SQLite's CURRENT_TIMESTAMP"""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+
+def summarize(emotions, postures):
+    """Collapse buffered rows into (interview_id, kind, label, count, confidence_sum, duration_sum) deltas"""
+    totals = {}
+    for interview_id, emotion_label, confidence, _ in emotions:
+        key = (interview_id, 'emotion', emotion_label)
+        count, confidence_sum, duration_sum = totals.get(key, (0, 0.0, 0.0))
+        totals[key] = (count + 1, confidence_sum + confidence, duration_sum)
+    for interview_id, posture_label, _, duration in postures:
+        key = (interview_id, 'posture', posture_label)
+        count, confidence_sum, duration_sum = totals.get(key, (0, 0.0, 0.0))
+        totals[key] = (count + 1, confidence_sum, duration_sum + (duration or 0))
+    return [key + value for key, value in totals.items()]
+
+class TelemetryWriter:
+    """Buffer emotion and posture rows and write them in batched transactions"""
+
+    def __init__(self, flush_rows=200, flush_interval_ms=1000, max_buffered_rows=50000):
+        self.flush_rows = max(1, flush_rows)
+        self.flush_interval = max(0.01, flush_interval_ms / 1000.0)
+        self.max_buffered_rows = max(self.flush_rows, max_buffered_rows)
+
+        self._emotions = []
+        self._postures = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+        self.rows_written = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.dropped_rows = 0
+
+    def add_emotion(self, interview_id, emotion_label, confidence):
+        """Queue an emotion_timeline row"""
+        self._add(self._emotions, (int(interview_id), emotion_label, confidence, utc_timestamp()))
+
+    def add_posture(self, interview_id, posture_label, timestamp=None, duration=None):
+        """Queue a posture_events row; intervals carry their start and duration in seconds"""
+        self._add(self._postures, (int(interview_id), posture_label, timestamp or utc_timestamp(), duration))
+
+    def _add(self, rows, row):
+        with self._cond:
+            self._ensure_started()
+            rows.append(row)
+            if self._buffered() >= self.flush_rows:
+                self._cond.notify()
+
+    def _buffered(self):
+        return len(self._emotions) + len(self._postures)
+
+    def _ensure_started(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='telemetry-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._buffered() >= self.flush_rows, timeout=self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Write every buffered row now, in one transaction"""
+        # Serialized so a flush from /end waits for an in-progress background flush
+        with self._flush_lock:
+            with self._cond:
+                emotions, self._emotions = self._emotions, []
+                postures, self._postures = self._postures, []
+
+            if not emotions and not postures:
+                return 0
+
+            try:
+                conn = get_db_connection()
+                try:
+                    cursor = conn.cursor()
+                    cursor.executemany(
+                        'INSERT INTO emotion_timeline (interview_id, emotion_label, confidence, timestamp) VALUES (?, ?, ?, ?)',
+                        emotions
+                    )
+                    cursor.executemany(
+                        'INSERT INTO posture_events (interview_id, posture_label, timestamp, duration) VALUES (?, ?, ?, ?)',
+                        postures
+                    )
+                    # Keep the per-interview counters in step, in the same transaction
+                    cursor.executemany('''
+                        INSERT INTO interview_stats (interview_id, kind, label, count, confidence_sum, duration_sum)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        ON CONFLICT (interview_id, kind, label) DO UPDATE SET
+                            count = count + excluded.count,
+                            confidence_sum = confidence_sum + excluded.confidence_sum,
+                            duration_sum = duration_sum + excluded.duration_sum
+                    ''', summarize(emotions, postures))
+                    conn.commit()
+                finally:
+                    conn.close()
+            except Exception as e:
+                print(f"Telemetry flush error: {str(e)}")
+                self._requeue(emotions, postures)
+                return 0
+
+            with self._cond:
+                self.flushes += 1
+                self.rows_written += len(emotions) + len(postures)
+            return len(emotions) + len(postures)
+
+    def _requeue(self, emotions, postures):
+        """Put rows from a failed flush back in front, dropping the oldest past the cap"""
+        with self._cond:
+            self.failed_flushes += 1
+            self._emotions = emotions + self._emotions
+            self._postures = postures + self._postures
+
+            overflow = self._buffered() - self.max_buffered_rows
+            if overflow > 0:
+                dropped_emotions = min(overflow, len(self._emotions))
+                del self._emotions[:dropped_emotions]
+                del self._postures[:overflow - dropped_emotions]
+                self.dropped_rows += overflow
+
+    def stats(self):
+        """Return buffer and flush counters"""
+        with self._cond:
+            return {
+                'buffered': self._buffered(),
+                'rows_written': self.rows_written,
+                'flushes': self.flushes,
+                'failed_flushes': self.failed_flushes,
+                'dropped_rows': self.dropped_rows
+            }
+
+telemetry_writer = TelemetryWriter(
+    flush_rows=TELEMETRY_FLUSH_ROWS,
+    flush_interval_ms=TELEMETRY_FLUSH_INTERVAL_MS,
+    max_buffered_rows=TELEMETRY_MAX_BUFFERED_ROWS
+)
+
+# Don't lose buffered rows on a clean shutdown
+atexit.register(telemetry_writer.flush)
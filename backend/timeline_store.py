@@ -0,0 +1,191 @@
+from datetime import datetime, timedelta
+from array import array
+import struct
+import zlib
+import sys
+
+# Completed interviews keep their emotion timeline as one packed blob instead of
+# a row per frame. Layout (little-endian):
+#   header   version uint8, samples uint32, first timestamp int64 (epoch seconds),
+#            codebook length uint16, codebook (labels joined by ',')
+#   body     zlib of: label codes uint8[n], confidence uint8[n] in half-percent
+#            steps, seconds since the previous sample uint32[n]
+# Encoding only needs the standard library; decoding for /details uses NumPy.
+
+TIMELINE_FORMAT_VERSION = 1
+HEADER = struct.Struct('<BIqH')
+EPOCH = datetime(1970, 1, 1)
+
+def to_epoch_seconds(timestamp):
+    """Stored UTC timestamp ('YYYY-MM-DD HH:MM:SS') as whole epoch seconds"""
+    return int((datetime.fromisoformat(timestamp).replace(tzinfo=None) - EPOCH).total_seconds())
+
+def encode_timeline(rows):
+    """Pack (label, confidence, timestamp) rows, already in time order, into a blob"""
+    codebook = []
+    codes = array('B')
+    confidences = array('B')
+    deltas = array('I')
+
+    previous = None
+    for label, confidence, timestamp in rows:
+        if label not in codebook:
+            codebook.append(label)
+        codes.append(codebook.index(label))
+        confidences.append(min(255, max(0, round(confidence * 2))))
+
+        seconds = to_epoch_seconds(timestamp)
+        deltas.append(0 if previous is None else max(0, seconds - previous))
+        previous = max(seconds, previous or seconds)
+
+    first_seen = to_epoch_seconds(rows[0][2]) if rows else 0
+    labels = ','.join(codebook).encode()
+    if sys.byteorder != 'little':
+        deltas.byteswap()
+
+    header = HEADER.pack(TIMELINE_FORMAT_VERSION, len(codes), first_seen, len(labels)) + labels
+    return header + zlib.compress(codes.tobytes() + confidences.tobytes() + deltas.tobytes())
+
+def read_header(blob):
+    """Return (samples, first_seen, codebook, body_offset) of a packed timeline"""
+    version, samples, first_seen, labels_length = HEADER.unpack_from(blob)
+    if version != TIMELINE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported timeline format {version}")
+    labels = blob[HEADER.size:HEADER.size + labels_length].decode()
+    return samples, first_seen, labels.split(',') if labels else [], HEADER.size + labels_length
+
+def decode_rows(blob):
+    """Unpack a blob back into (label, confidence, timestamp) rows without NumPy"""
+    samples, first_seen, codebook, offset = read_header(blob)
+    body = zlib.decompress(blob[offset:])
+
+    codes = array('B', body[:samples])
+    confidences = array('B', body[samples:2 * samples])
+    deltas = array('I', body[2 * samples:])
+    if sys.byteorder != 'little':
+        deltas.byteswap()
+
+    rows = []
+    seconds = first_seen
+    for code, confidence, delta in zip(codes, confidences, deltas):
+        seconds += delta
+        timestamp = (EPOCH + timedelta(seconds=seconds)).strftime('%Y-%m-%d %H:%M:%S')
+        rows.append((codebook[code], confidence / 2, timestamp))
+    return rows
+
+class PackedTimeline:
+    """A decoded timeline as NumPy arrays, with the /details views computed vectorized"""
+
+    def __init__(self, blob):
+        import numpy as np
+
+        samples, first_seen, codebook, offset = read_header(blob)
+        body = zlib.decompress(blob[offset:])
+
+        self.codebook = np.array(codebook, dtype=object)
+        self.codes = np.frombuffer(body, dtype=np.uint8, count=samples)
+        self.confidence = np.frombuffer(body, dtype=np.uint8, count=samples, offset=samples) / 2
+        deltas = np.frombuffer(body, dtype='<u4', count=samples, offset=2 * samples)
+        self.seconds = first_seen + np.cumsum(deltas, dtype=np.int64)
+
+        self.samples = samples
+        self.span = int(self.seconds[-1] - self.seconds[0]) if samples else 0
+
+    def timestamps(self, seconds):
+        """Epoch seconds as stored timestamp strings"""
+        import numpy as np
+        text = np.datetime_as_string(seconds.astype('datetime64[s]'), unit='s')
+        return np.char.replace(text, 'T', ' ')
+
+    def points(self):
+        """Every sample, as the raw /details timeline"""
+        labels = self.codebook[self.codes].tolist()
+        confidences = self.confidence.tolist()
+        timestamps = self.timestamps(self.seconds).tolist()
+        return [
+            {'emotion': label, 'confidence': confidence, 'timestamp': timestamp}
+            for label, confidence, timestamp in zip(labels, confidences, timestamps)
+        ]
+
+    def buckets(self, resolution):
+        """Resolution-second buckets, same rules as database.get_bucketed_timeline"""
+        import numpy as np
+
+        if not self.samples:
+            return []
+
+        bucket = ((self.seconds - self.seconds[0]) // resolution).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+        index = np.cumsum(np.r_[False, bucket[1:] != bucket[:-1]])
+
+        # Per (bucket, label): count, confidence sum and first sample
+        n_labels = len(self.codebook)
+        key = index * n_labels + self.codes
+        size = len(starts) * n_labels
+        counts = np.bincount(key, minlength=size)
+        sums = np.bincount(key, weights=self.confidence, minlength=size)
+        first = np.full(size, self.samples, dtype=np.int64)
+        np.minimum.at(first, key, np.arange(self.samples))
+
+        # Dominant label: most samples, ties going to the label seen first
+        rank = (counts * (self.samples + 1) + (self.samples - first)).reshape(-1, n_labels)
+        dominant = rank.argmax(axis=1)
+        chosen = np.arange(len(starts)) * n_labels + dominant
+        averages = np.round(sums[chosen] / counts[chosen], 1)
+        totals = counts.reshape(-1, n_labels).sum(axis=1)
+
+        labels = self.codebook[dominant].tolist()
+        timestamps = self.timestamps(self.seconds[starts]).tolist()
+        return [
+            {'emotion': label, 'confidence': confidence, 'timestamp': timestamp, 'samples': samples}
+            for label, confidence, timestamp, samples in zip(labels, averages.tolist(), timestamps, totals.tolist())
+        ]
+
+def load_packed_timeline(cursor, interview_id):
+    """Return an interview's PackedTimeline, or None if its timeline is still in rows"""
+    cursor.execute('SELECT data FROM emotion_timeline_packed WHERE interview_id = ?', (interview_id,))
+    row = cursor.fetchone()
+    return PackedTimeline(row['data']) if row else None
+
+def pack_interview_timeline(cursor, interview_id):
+    """Move an interview's emotion_timeline rows into its packed blob.
+
+    Rows that arrive after packing (late frames) are merged in on the next call,
+    which build_review makes when it finds any.
+    Committed with the caller's transaction; returns the number of samples packed.
+    """
+    cursor.execute('''
+        SELECT emotion_label, confidence, timestamp
+        FROM emotion_timeline
+        WHERE interview_id = ?
+        ORDER BY timestamp, id
+    ''', (interview_id,))
+    rows = [(row['emotion_label'], row['confidence'], row['timestamp']) for row in cursor.fetchall()]
+    if not rows:
+        return 0
+
+    cursor.execute('SELECT data FROM emotion_timeline_packed WHERE interview_id = ?', (interview_id,))
+    existing = cursor.fetchone()
+    if existing:
+        rows = sorted(decode_rows(existing['data']) + rows, key=lambda row: to_epoch_seconds(row[2]))
+
+    cursor.execute('''
+        INSERT OR REPLACE INTO emotion_timeline_packed (interview_id, samples, data)
+        VALUES (?, ?, ?)
+    ''', (interview_id, len(rows), encode_timeline(rows)))
+    cursor.execute('DELETE FROM emotion_timeline WHERE interview_id = ?', (interview_id,))
+    return len(rows)
+
+def pack_completed_timelines(cursor):
+    """Pack the row timelines of every completed interview (migration step)"""
+    cursor.execute('''
+        SELECT DISTINCT e.interview_id
+        FROM emotion_timeline e
+        JOIN interviews i ON i.id = e.interview_id
+        WHERE i.status = 'completed'
+    ''')
+    interview_ids = [row['interview_id'] for row in cursor.fetchall()]
+    for interview_id in interview_ids:
+        pack_interview_timeline(cursor, interview_id)
+    if interview_ids:
+        print(f"Packed emotion timelines of {len(interview_ids)} completed interviews")
@@ -8,6 +8,25 @@ let currentEmotion = 'neutral';
 let currentPosture = 'Good';
 let mediapipePose;
 let camera;
+let frameCanvas;
+let frameSocket = null;
+let frameSocketRetryAt = 0;
+let faceCanvas;
+let latestFaceBox = null;
+let latestFaceBoxAt = 0;
+let postureStarted = false;
+let postureCandidate = null;  // { label, since } - a new posture not yet held long enough
+let postureEvents = [];       // posture changes waiting to be sent
+let postureFlushInterval;
+
+const FRAME_SOCKET_RETRY_MS = 15000;
+const FRAME_SOCKET_END_TIMEOUT_MS = 2000;
+const FRAME_HEADER_SIZE = 9;
+const FRAME_FORMATS = { jpeg: 0, gray: 1, rgb: 2, face: 3 };
+const FACE_CROP_SIZE = 48;  // emotion model input size
+const FACE_BOX_MAX_AGE_MS = 500;
+const POSTURE_DEBOUNCE_MS = 1000;  // a new posture must hold this long to count
+const POSTURE_FLUSH_MS = 10000;
 
 // Initialize AI overlay
 function initAIOverlay() {
@@ -32,27 +51,205 @@ function initAIOverlay() {
 
 // Start emotion detection (every 1.5 seconds)
 function startEmotionDetection() {
+    openFrameSocket();
+
     emotionInterval = setInterval(() => {
         captureFrameAndDetectEmotion();
     }, 1500);  // Every 1.5 seconds
 }
 
+// Open the streaming channel for this interview (POST /detect is the fallback)
+function openFrameSocket() {
+    const interviewId = sessionStorage.getItem('interview_id');
+    const streamUrl = `${BASE_URL.replace(/^http/, 'ws')}/api/emotion/stream/${interviewId}`;
+
+    let socket;
+    try {
+        socket = new WebSocket(streamUrl);
+    } catch (error) {
+        console.error('Frame stream unavailable:', error);
+        frameSocketRetryAt = Date.now() + FRAME_SOCKET_RETRY_MS;
+        return;
+    }
+
+    socket.binaryType = 'arraybuffer';
+
+    socket.onmessage = (event) => {
+        try {
+            handleEmotionResult(JSON.parse(event.data));
+        } catch (error) {
+            console.error('Frame stream message error:', error);
+        }
+    };
+
+    socket.onclose = () => {
+        if (frameSocket === socket) {
+            frameSocket = null;
+        }
+        frameSocketRetryAt = Date.now() + FRAME_SOCKET_RETRY_MS;
+    };
+
+    frameSocket = socket;
+}
+
+// Send one frame on the stream as
+// [4-byte length][1-byte format][2-byte width][2-byte height][payload]
+function streamFrame(formatCode, width, height, payload) {
+    const message = new Uint8Array(FRAME_HEADER_SIZE + payload.length);
+    const header = new DataView(message.buffer);
+    header.setUint32(0, payload.length);
+    header.setUint8(4, formatCode);
+    header.setUint16(5, width);
+    header.setUint16(7, height);
+    message.set(payload, FRAME_HEADER_SIZE);
+    frameSocket.send(message);
+}
+
+// Tell the emotion worker the interview is over so it writes out its buffered
+// samples; resolves on its acknowledgement, or after a timeout
+function endFrameSocket(socket) {
+    return new Promise((resolve) => {
+        const timer = setTimeout(resolve, FRAME_SOCKET_END_TIMEOUT_MS);
+        const done = () => {
+            clearTimeout(timer);
+            resolve();
+        };
+
+        socket.onmessage = (event) => {
+            try {
+                if (JSON.parse(event.data).ended) {
+                    done();
+                }
+            } catch (error) {}
+        };
+        socket.onclose = done;
+        socket.send('end');
+    });
+}
+
+function isFrameSocketOpen() {
+    return frameSocket && frameSocket.readyState === WebSocket.OPEN;
+}
+
+// Handle an emotion result from either transport
+function handleEmotionResult(data) {
+    if (data.success && data.emotion !== 'no_face') {
+        updateEmotionDisplay(data.emotion, data.confidence);
+    }
+}
+
+// Estimate a square face box (video pixels) from MediaPipe's face landmarks (0-10)
+function faceBoxFromLandmarks(landmarks) {
+    // Landmarks are normalized; the crop is cut in the video's intrinsic pixels,
+    // which depend on the camera (720p, portrait on mobile, ...)
+    const videoWidth = videoElement.videoWidth;
+    const videoHeight = videoElement.videoHeight;
+    if (!videoWidth || !videoHeight) {
+        return null;
+    }
+
+    const facePoints = landmarks.slice(0, 11);
+    if (facePoints.some((point) => point.visibility !== undefined && point.visibility < 0.5)) {
+        return null;
+    }
+
+    const xs = facePoints.map((point) => point.x * videoWidth);
+    const ys = facePoints.map((point) => point.y * videoHeight);
+    const size = (Math.max(...xs) - Math.min(...xs)) * 1.2;
+    if (size < 24) {
+        return null;
+    }
+
+    const centerX = (Math.max(...xs) + Math.min(...xs)) / 2;
+    const centerY = ys.reduce((sum, y) => sum + y, 0) / ys.length + size * 0.1;
+    return { x: centerX - size / 2, y: centerY - size / 2, size: size };
+}
+
+// Cut the face out of the current video frame as a model-size grayscale buffer
+function captureFaceCrop(box) {
+    if (!faceCanvas) {
+        faceCanvas = document.createElement('canvas');
+        faceCanvas.width = FACE_CROP_SIZE;
+        faceCanvas.height = FACE_CROP_SIZE;
+    }
+    const ctx = faceCanvas.getContext('2d', { willReadFrequently: true });
+    ctx.drawImage(videoElement, box.x, box.y, box.size, box.size, 0, 0, FACE_CROP_SIZE, FACE_CROP_SIZE);
+
+    const rgba = ctx.getImageData(0, 0, FACE_CROP_SIZE, FACE_CROP_SIZE).data;
+    const gray = new Uint8Array(FACE_CROP_SIZE * FACE_CROP_SIZE);
+    for (let i = 0; i < gray.length; i++) {
+        gray[i] = Math.round(0.299 * rgba[i * 4] + 0.587 * rgba[i * 4 + 1] + 0.114 * rgba[i * 4 + 2]);
+    }
+    return gray;
+}
+
+// Send a face crop (2.3 KB) instead of a full JPEG frame
+async function sendFaceCrop(crop) {
+    if (isFrameSocketOpen()) {
+        streamFrame(FRAME_FORMATS.face, FACE_CROP_SIZE, FACE_CROP_SIZE, crop);
+        return;
+    }
+
+    const interviewId = sessionStorage.getItem('interview_id');
+    const params = new URLSearchParams({
+        interview_id: interviewId,
+        format: 'face',
+        width: FACE_CROP_SIZE,
+        height: FACE_CROP_SIZE
+    });
+
+    try {
+        const response = await fetch(`${BASE_URL}/api/emotion/detect?${params}`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/octet-stream' },
+            body: crop,
+            credentials: 'include'
+        });
+        handleEmotionResult(await response.json());
+    } catch (error) {
+        console.error('Emotion detection error:', error);
+        // Don't crash - just skip this update
+    }
+}
+
 // Capture frame and detect emotion
 async function captureFrameAndDetectEmotion() {
     try {
-        // Create hidden canvas
-        const canvas = document.createElement('canvas');
-        canvas.width = 640;
-        canvas.height = 480;
-        const ctx = canvas.getContext('2d');
+        if (!frameSocket && Date.now() >= frameSocketRetryAt) {
+            openFrameSocket();
+        }
+
+        // Pose tracking already knows where the face is - send just the crop
+        if (latestFaceBox && Date.now() - latestFaceBoxAt < FACE_BOX_MAX_AGE_MS && videoElement.videoWidth) {
+            await sendFaceCrop(captureFaceCrop(latestFaceBox));
+            return;
+        }
+
+        // Reuse one hidden canvas for every frame
+        if (!frameCanvas) {
+            frameCanvas = document.createElement('canvas');
+            frameCanvas.width = 640;
+            frameCanvas.height = 480;
+        }
+        const ctx = frameCanvas.getContext('2d');
 
         // Draw current video frame
         ctx.drawImage(videoElement, 0, 0, 640, 480);
 
         // Convert to blob
-        canvas.toBlob(async (blob) => {
+        frameCanvas.toBlob(async (blob) => {
             if (!blob) return;
 
+            if (isFrameSocketOpen()) {
+                try {
+                    const payload = new Uint8Array(await blob.arrayBuffer());
+                    streamFrame(FRAME_FORMATS.jpeg, 0, 0, payload);
+                    return;
+                } catch (error) {
+                    console.error('Frame stream send error:', error);
+                }
+            }
+
             const interviewId = sessionStorage.getItem('interview_id');
             const formData = new FormData();
             formData.append('frame', blob, 'frame.jpg');
@@ -65,10 +262,7 @@ async function captureFrameAndDetectEmotion() {
                     credentials: 'include'
                 });
 
-                const data = await response.json();
-                if (data.success && data.emotion !== 'no_face') {
-                    updateEmotionDisplay(data.emotion, data.confidence);
-                }
+                handleEmotionResult(await response.json());
             } catch (error) {
                 console.error('Emotion detection error:', error);
                 // Don't crash - just skip this update
@@ -115,6 +309,8 @@ function initPostureDetection() {
 
     camera.start();
     mediapipePose = pose;
+
+    postureFlushInterval = setInterval(() => flushPostureEvents(false), POSTURE_FLUSH_MS);
 }
 
 // Handle pose detection results
@@ -127,9 +323,41 @@ function onPoseResults(results) {
     const landmarks = results.poseLandmarks;
     const posture = calculatePosture(landmarks);
 
-    if (posture !== currentPosture) {
+    // Remember where the face is so emotion frames can be cropped client-side
+    const faceBox = faceBoxFromLandmarks(landmarks);
+    if (faceBox) {
+        latestFaceBox = faceBox;
+        latestFaceBoxAt = Date.now();
+    }
+
+    trackPosture(posture);
+}
+
+// Record posture changes, ignoring flips that don't last POSTURE_DEBOUNCE_MS
+function trackPosture(posture) {
+    const now = Date.now();
+
+    if (!postureStarted) {
+        postureStarted = true;
+        updatePostureDisplay(posture);
+        postureEvents.push({ posture_label: posture, timestamp: now });
+        return;
+    }
+
+    if (posture === currentPosture) {
+        postureCandidate = null;
+        return;
+    }
+
+    if (!postureCandidate || postureCandidate.label !== posture) {
+        postureCandidate = { label: posture, since: now };
+        return;
+    }
+
+    if (now - postureCandidate.since >= POSTURE_DEBOUNCE_MS) {
         updatePostureDisplay(posture);
-        savePostureEvent(posture);
+        postureEvents.push({ posture_label: posture, timestamp: postureCandidate.since });
+        postureCandidate = null;
     }
 }
 
@@ -185,29 +413,55 @@ function updatePostureDisplay(posture) {
     document.getElementById('postureEmoji').textContent = emojiMap[posture];
 }
 
-// Save posture event to backend
-async function savePostureEvent(posture) {
+// Send buffered posture changes; the server stores them as intervals.
+// Until the final flush the last change starts a run that is still going,
+// so it is kept and sent again as the first event of the next batch.
+async function flushPostureEvents(final = false) {
     const interviewId = sessionStorage.getItem('interview_id');
 
+    if (!interviewId || postureEvents.length === 0 || (!final && postureEvents.length < 2)) {
+        return;
+    }
+
+    const events = postureEvents;
+    postureEvents = final ? [] : [events[events.length - 1]];
+
     try {
-        await fetch(`${BASE_URL}/api/interview/save-posture`, {
+        const response = await fetch(`${BASE_URL}/api/interview/save-posture/batch`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             credentials: 'include',
+            keepalive: final,
             body: JSON.stringify({
                 interview_id: interviewId,
-                posture_label: posture
+                events: events,
+                sent_at: Date.now(),
+                final: final
             })
         });
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
     } catch (error) {
         console.error('Failed to save posture:', error);
-        // Don't crash - just log
+        // Keep the events for the next flush - don't crash
+        postureEvents = events.concat(postureEvents.slice(final ? 0 : 1));
     }
 }
 
 // Stop AI overlay (called when ending interview)
-function stopAIOverlay() {
+async function stopAIOverlay() {
     clearInterval(emotionInterval);
+    clearInterval(postureFlushInterval);
+
+    if (frameSocket) {
+        const socket = frameSocket;
+        frameSocket = null;
+        if (socket.readyState === WebSocket.OPEN) {
+            await endFrameSocket(socket);
+        }
+        socket.close();
+    }
 
     if (camera) {
         camera.stop();
@@ -221,3 +475,4 @@ function stopAIOverlay() {
 // Export functions for use in interview.js
 window.initAIOverlay = initAIOverlay;
 window.stopAIOverlay = stopAIOverlay;
+window.flushPostureEvents = flushPostureEvents;
@@ -109,7 +109,8 @@ async function askQuestion() {
     }
 
     try {
-        const response = await fetch(`${BASE_URL}/api/interview/generate-question`, {
+        // Tokens arrive as Server-Sent Events so speech can start after the first sentence
+        const response = await fetch(`${BASE_URL}/api/interview/generate-question/stream`, {
             method: "POST",
             headers: { "Content-Type": "application/json" },
             credentials: "include",
@@ -120,12 +121,20 @@ async function askQuestion() {
             })
         });
 
-        const data = await response.json();
+        if (!response.ok || !response.body) {
+            alert("Failed to generate question.");
+            await endInterview();
+            return;
+        }
 
-        if (response.ok && data.success) {
+        const speaker = createQuestionSpeaker();
+        const data = await readQuestionStream(response.body, (text) => speaker.add(text));
+
+        if (data && data.success) {
             currentQuestionId = data.question_id;
-            speakQuestion(data.question);
+            speaker.finish();
         } else {
+            synthesis.cancel();
             alert("Failed to generate question.");
             await endInterview();
         }
@@ -135,20 +144,111 @@ async function askQuestion() {
     }
 }
 
-function speakQuestion(text) {
+// Read "event: ...\ndata: {...}" messages, passing tokens on; returns the final "done" payload
+async function readQuestionStream(body, onToken) {
+    const reader = body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let result = null;
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+            const event = parseServerSentEvent(buffer.slice(0, boundary));
+            buffer = buffer.slice(boundary + 2);
+
+            if (event.type === "token") {
+                onToken(event.data.text);
+            } else if (event.type === "done" || event.type === "error") {
+                result = event.data;
+            }
+        }
+    }
+
+    return result;
+}
+
+function parseServerSentEvent(raw) {
+    let type = "message";
+    let data = "";
+
+    raw.split("\n").forEach((line) => {
+        if (line.startsWith("event:")) {
+            type = line.slice(6).trim();
+        } else if (line.startsWith("data:")) {
+            data += line.slice(5).trim();
+        }
+    });
+
+    return { type: type, data: data ? JSON.parse(data) : null };
+}
+
+// Speak the question sentence by sentence as it streams in, then start listening
+function createQuestionSpeaker() {
     stopListening(); // safety
 
-    const utterance = new SpeechSynthesisUtterance(text);
-    utterance.rate = 0.9;
-    utterance.lang = "en-US";
+    let pending = "";
+    let speaking = 0;
+    let finished = false;
+    let listeningScheduled = false;
+
+    function speak(text) {
+        if (!text.trim()) return;
+
+        const utterance = new SpeechSynthesisUtterance(text.trim());
+        utterance.rate = 0.9;
+        utterance.lang = "en-US";
+
+        speaking++;
+        utterance.onend = () => {
+            speaking--;
+            listenWhenDone();
+        };
+
+        synthesis.speak(utterance);
+    }
+
+    function listenWhenDone() {
+        if (!finished || speaking > 0 || listeningScheduled) return;
 
-    utterance.onend = () => {
+        listeningScheduled = true;
         setTimeout(() => {
             startListening();
         }, 1000);
-    };
+    }
 
-    synthesis.speak(utterance);
+    return {
+        add(text) {
+            pending += text;
+
+            // Speak everything up to the last completed sentence
+            const sentenceEnd = /[.?!](\s|$)/g;
+            let lastEnd = -1;
+            let match;
+            while ((match = sentenceEnd.exec(pending)) !== null) {
+                if (match.index + 1 < pending.length) {
+                    lastEnd = match.index + 1;
+                }
+            }
+
+            if (lastEnd > 0) {
+                speak(pending.slice(0, lastEnd));
+                pending = pending.slice(lastEnd);
+            }
+        },
+
+        finish() {
+            speak(pending);
+            pending = "";
+            finished = true;
+            listenWhenDone();
+        }
+    };
 }
 
 // ================= LISTEN + SILENCE =================
@@ -254,7 +354,13 @@ async function endInterview() {
     } catch (e) {}
 
     if (typeof stopAIOverlay === "function") {
-        stopAIOverlay();
+        // Waits for the emotion worker to write out its buffered samples
+        await stopAIOverlay();
+    }
+
+    // Posture changes must reach the server before /end summarizes them
+    if (typeof flushPostureEvents === "function") {
+        await flushPostureEvents(true);
     }
 
     try {